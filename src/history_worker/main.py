@@ -287,14 +287,22 @@ async def fetch_conversation_from_redis(session_id: str) -> dict:
     Fetch conversation data from Redis.
     """
     try:
-        redis_key = f"session:{session_id}"
-        conversation_data = await redis_client.get(redis_key)
+        # Read both the single-document and the list-based conversation layouts in one round trip
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.get(f"session:{session_id}")
+            pipe.hgetall(f"session:{session_id}:meta")
+            pipe.lrange(f"session:{session_id}:messages", 0, -1)
+            conversation_data, meta, stored_messages = await pipe.execute()
         
-        if not conversation_data:
+        if not conversation_data and not meta:
             logger.warning(f"No conversation data found in Redis for session {session_id}")
             return None
         
-        conversation = json.loads(conversation_data)
+        conversation = json.loads(conversation_data) if conversation_data else {"title": None, "messages": []}
+        for field, value in meta.items():
+            conversation[field.decode()] = value.decode()
+        if stored_messages:
+            conversation.setdefault("messages", []).extend(json.loads(m) for m in stored_messages)
         logger.info(f"Retrieved conversation data from Redis for session {session_id} with {len(conversation.get('messages', []))} messages")
         return conversation
         
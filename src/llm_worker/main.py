@@ -22,27 +22,36 @@ Usage:
 """
 
 import os
+import io
 import json
 import asyncio
 import logging
 import signal
 import sys
-import aiohttp
+import time
+import functools
 import hashlib
+import httpx
+import orjson
 import uuid
+from contextlib import AsyncExitStack
 from contextvars import ContextVar
 from datetime import datetime, timezone
 from pathlib import Path
 from dotenv import load_dotenv
 from azure.identity.aio import DefaultAzureCredential
-from azure.servicebus.aio import ServiceBusClient
+from azure.servicebus.aio import AutoLockRenewer, ServiceBusClient
 from azure.servicebus import ServiceBusMessage
+from azure.servicebus.exceptions import MessageSizeExceededError
 from azure.monitor.opentelemetry import configure_azure_monitor
 from opentelemetry import trace
 from opentelemetry.sdk.trace.export import SpanProcessor
+from opentelemetry.sdk.trace.sampling import Decision, Sampler, SamplingResult
+from opentelemetry.trace import NonRecordingSpan, SpanContext, TraceFlags
 from opentelemetry.instrumentation.openai_v2 import OpenAIInstrumentor
-from openai import AsyncAzureOpenAI
+from openai import AsyncAzureOpenAI, DefaultAsyncHttpxClient
 import redis.asyncio as redis
+from redis.exceptions import NoScriptError
 from redis_entraid.cred_provider import create_from_default_azure_credential
 from jinja2 import Environment, FileSystemLoader
 from azure.storage.blob import ContentSettings
@@ -59,10 +68,10 @@ OpenAIInstrumentor().instrument()
 # Set environment variable to capture message content
 os.environ.setdefault("OTEL_INSTRUMENTATION_GENAI_CAPTURE_MESSAGE_CONTENT", "true")
 
-# Context variables for storing application-specific information across spans
-current_user_id: ContextVar[str] = ContextVar('current_user_id', default=None)
-current_session_id: ContextVar[str] = ContextVar('current_session_id', default=None)
-current_message_id: ContextVar[str] = ContextVar('current_message_id', default=None)
+# Context variable holding (user_id, session_id, message_id) for the current operation
+current_app_context: ContextVar[tuple] = ContextVar('current_app_context', default=(None, None, None))
+
+APP_NAME_ATTRIBUTES = {"app.name": "llm-worker"}
 
 
 def set_context_attributes(user_id: str = None, session_id: str = None, message_id: str = None):
@@ -74,21 +83,19 @@ def set_context_attributes(user_id: str = None, session_id: str = None, message_
         session_id: Session ID to set in context  
         message_id: Message ID to set in context
     """
-    if user_id is not None:
-        current_user_id.set(user_id)
-    if session_id is not None:
-        current_session_id.set(session_id)
-    if message_id is not None:
-        current_message_id.set(message_id)
+    current_user, current_session, current_message = current_app_context.get()
+    current_app_context.set((
+        user_id if user_id is not None else current_user,
+        session_id if session_id is not None else current_session,
+        message_id if message_id is not None else current_message,
+    ))
 
 
 def clear_context_attributes():
     """
     Clear all context variables.
     """
-    current_user_id.set(None)
-    current_session_id.set(None)
-    current_message_id.set(None)
+    current_app_context.set((None, None, None))
 
 
 class AppAttributesSpanProcessor(SpanProcessor):
@@ -97,6 +104,7 @@ class AppAttributesSpanProcessor(SpanProcessor):
     
     This processor automatically adds user_id, session_id, and message_id attributes
     to every span created by this application, pulling the values from context variables.
+    Non-recording spans are skipped and all attributes are applied in a single call.
     """
     
     def on_start(self, span, parent_context=None):
@@ -107,25 +115,23 @@ class AppAttributesSpanProcessor(SpanProcessor):
             span: The span that was started
             parent_context: The parent context of the span
         """
-        try:
-            # Add user_id if available in context
-            user_id = current_user_id.get()
+        if not span.is_recording():
+            return
+
+        user_id, session_id, message_id = current_app_context.get()
+        if user_id or session_id or message_id:
+            attributes = dict(APP_NAME_ATTRIBUTES)
             if user_id:
-                span.set_attribute("app.user_id", user_id)
-            
-            # Add session_id if available in context
-            session_id = current_session_id.get()
+                attributes["app.user_id"] = user_id
             if session_id:
-                span.set_attribute("app.session_id", session_id)
-            
-            # Add message_id if available in context
-            message_id = current_message_id.get()
+                attributes["app.session_id"] = session_id
             if message_id:
-                span.set_attribute("app.chat_message_id", message_id)
-                
-            # Add application name for easier filtering
-            span.set_attribute("app.name", "llm-worker")
-            
+                attributes["app.chat_message_id"] = message_id
+        else:
+            attributes = APP_NAME_ATTRIBUTES
+
+        try:
+            span.set_attributes(attributes)
         except Exception as e:
             # Don't fail span creation if attribute setting fails
             logger.warning(f"Failed to add application attributes to span: {e}")
@@ -150,6 +156,19 @@ SERVICEBUS_USER_MESSAGES_SUBSCRIPTION = os.getenv("SERVICEBUS_USER_MESSAGES_SUBS
 SERVICEBUS_TOKEN_STREAMS_TOPIC = os.getenv("SERVICEBUS_TOKEN_STREAMS_TOPIC")
 SERVICEBUS_MESSAGE_COMPLETED_TOPIC = os.getenv("SERVICEBUS_MESSAGE_COMPLETED_TOPIC")
 MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", 10))
+# Prefetched messages are not lock-renewed until received, so keep the buffer proportional to concurrency
+SERVICEBUS_PREFETCH_COUNT = int(os.getenv("SERVICEBUS_PREFETCH_COUNT", MAX_CONCURRENCY * 3))
+MAX_LOCK_RENEWAL_DURATION = int(os.getenv("MAX_LOCK_RENEWAL_DURATION", 300))
+# Independent Service Bus connections receiving from the subscription; the prefetch budget is split across them
+NUM_RECEIVERS = max(1, int(os.getenv("NUM_RECEIVERS", 2)))
+# How often cached Entra ID tokens are re-requested so refreshes happen off the request path
+CREDENTIAL_REFRESH_INTERVAL = int(os.getenv("CREDENTIAL_REFRESH_INTERVAL", 120))
+# Legacy token batching: at most TOKEN_BATCH_MAX messages per send; TOKEN_BATCH_MS optionally
+# waits after the first queued token so more tokens share the transfer (0 sends immediately)
+TOKEN_BATCH_MAX = max(1, int(os.getenv("TOKEN_BATCH_MAX", 100)))
+TOKEN_BATCH_MS = int(os.getenv("TOKEN_BATCH_MS", 0))
+# Number of token-stream sender links; matching MAX_CONCURRENCY gives every in-flight stream its own link
+TOKEN_STREAM_SENDERS = max(1, int(os.getenv("TOKEN_STREAM_SENDERS", MAX_CONCURRENCY)))
 
 
 if not SERVICEBUS_FULLY_QUALIFIED_NAMESPACE or not SERVICEBUS_USER_MESSAGES_TOPIC or not SERVICEBUS_USER_MESSAGES_SUBSCRIPTION or not SERVICEBUS_TOKEN_STREAMS_TOPIC:
@@ -166,9 +185,54 @@ logger = logging.getLogger(__name__)
 logger.setLevel(LOG_LEVEL)
 
 
+class LowValueSpanSampler(Sampler):
+    """
+    Sampler that drops low-value spans before delegating to the configured sampler.
+
+    Spans are dropped when their parent is an unsampled span (such as the detached context the
+    token publisher runs in) or when their name is in the configured deny-list.
+    """
+
+    def __init__(self, delegate: Sampler, excluded_span_names: frozenset):
+        self._delegate = delegate
+        self._excluded_span_names = excluded_span_names
+
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None, trace_state=None):
+        """
+        Decide whether a span should be recorded.
+
+        Returns:
+            SamplingResult: DROP for low-value spans, otherwise the delegate's decision
+        """
+        parent_span_context = trace.get_current_span(parent_context).get_span_context()
+        if (parent_span_context.is_valid and not parent_span_context.trace_flags.sampled) or name in self._excluded_span_names:
+            return SamplingResult(Decision.DROP, None, parent_span_context.trace_state if parent_span_context.is_valid else None)
+        return self._delegate.should_sample(parent_context, trace_id, name, kind, attributes, links, trace_state)
+
+    def get_description(self):
+        """Return a description of this sampler."""
+        return f"LowValueSpanSampler{{{self._delegate.get_description()}}}"
+
+
+# Fraction of traces recorded and exported. Unsampled traces get cheap non-recording spans,
+# so attribute work guarded by span.is_recording() is skipped entirely.
+TRACES_SAMPLING_RATIO = float(os.getenv("TRACES_SAMPLING_RATIO", "1.0"))
+
+# Comma-separated span names that are never recorded (e.g. chatty SDK spans)
+TRACES_EXCLUDED_SPAN_NAMES = frozenset(
+    name.strip() for name in os.getenv("TRACES_EXCLUDED_SPAN_NAMES", "").split(",") if name.strip()
+)
+
+# The distro exports spans through a BatchSpanProcessor; size it for streaming bursts so span
+# creation stays a queue append and exports go out in fewer, larger requests
+os.environ.setdefault("OTEL_BSP_MAX_QUEUE_SIZE", "8192")
+os.environ.setdefault("OTEL_BSP_MAX_EXPORT_BATCH_SIZE", "512")
+os.environ.setdefault("OTEL_BSP_SCHEDULE_DELAY", "2000")
+
 # Azure Monitor (optional, for observability)
 configure_azure_monitor(
     enable_live_metrics=True,
+    sampling_ratio=TRACES_SAMPLING_RATIO,
     instrumentation_options={
         "azure_sdk": {"enabled": True},
         "django": {"enabled": False},
@@ -183,6 +247,8 @@ configure_azure_monitor(
 
 # Add our custom span processor to the global tracer provider
 tracer_provider = trace.get_tracer_provider()
+if hasattr(tracer_provider, 'sampler'):
+    tracer_provider.sampler = LowValueSpanSampler(tracer_provider.sampler, TRACES_EXCLUDED_SPAN_NAMES)
 if hasattr(tracer_provider, 'add_span_processor'):
     app_attributes_processor = AppAttributesSpanProcessor()
     tracer_provider.add_span_processor(app_attributes_processor)
@@ -196,6 +262,9 @@ tracer = trace.get_tracer(__name__)
 # Azure OpenAI configuration  
 AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
 AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2025-04-01-preview")
+# Upper bound on generated tokens per completion call; caps per-request response buffers (0 disables the cap)
+MAX_COMPLETION_TOKENS = int(os.getenv("MAX_COMPLETION_TOKENS", 4096))
+COMPLETION_LIMITS = {"max_completion_tokens": MAX_COMPLETION_TOKENS} if MAX_COMPLETION_TOKENS > 0 else {}
 AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
 
 if not AZURE_OPENAI_ENDPOINT:
@@ -210,6 +279,10 @@ REDIS_PORT = int(os.getenv("REDIS_PORT", 6380))
 REDIS_SSL = os.getenv("REDIS_SSL", "true").lower() == "true"
 RUN_TTL_SECONDS = int(os.getenv("RUN_TTL_SECONDS", str(24 * 60 * 60)))
 RUN_EVENTS_MAXLEN = int(os.getenv("RUN_EVENTS_MAXLEN", "10000"))
+CONVERSATION_TTL_SECONDS = 24 * 60 * 60
+# "json" stores each conversation as one session:{id} document rewritten every turn;
+# "list" appends messages to session:{id}:messages with metadata in the session:{id}:meta hash
+CONVERSATION_STORAGE_MODE = os.getenv("CONVERSATION_STORAGE_MODE", "json").lower()
 STORAGE_ACCOUNT_URL = os.getenv("STORAGE_ACCOUNT_URL")
 ARTIFACTS_CONTAINER_NAME = os.getenv("ARTIFACTS_CONTAINER_NAME", "artifacts")
 
@@ -239,11 +312,33 @@ redis_client = None
 # Global Blob Storage client - will be initialized in main()
 blob_service_client = None
 
+# Global Service Bus topic senders - opened once on the sender connection in main();
+# token-stream senders are pooled so concurrent streams send over independent AMQP links
+token_stream_senders: asyncio.Queue | None = None
+message_completed_sender = None
+
+# Global Memory API HTTP session - will be initialized in main()
+memory_api_session: httpx.AsyncClient | None = None
+
 # Global shutdown event for graceful shutdown
 shutdown_event = asyncio.Event()
 
-# Global Jinja2 environment for system prompt template
+# Admission gate for concurrent message processing (resizable at runtime via set_max_concurrency)
+_active = 0
+_max_concurrent = MAX_CONCURRENCY
+_cond = asyncio.Condition()
+
+# Message settlement runs off the worker slot, bounded so a burst cannot flood the AMQP link
+settlement_semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+settlement_tasks: set = set()
+
+# Conversation persistence and completion events run after the response, bounded to limit Redis load
+persistence_semaphore = asyncio.Semaphore(int(os.getenv("PERSISTENCE_CONCURRENCY", MAX_CONCURRENCY)))
+persistence_tasks: set = set()
+
+# Global Jinja2 environment for system prompt template, compiled once at import time
 jinja_env = Environment(loader=FileSystemLoader(Path(__file__).parent))
+SYSTEM_PROMPT_TEMPLATE = jinja_env.get_template(SYSTEM_PROMPT_TEMPLATE_PATH.name)
 
 async def fetch_user_memory(user_id: str) -> dict:
     """
@@ -255,38 +350,50 @@ async def fetch_user_memory(user_id: str) -> dict:
         return {}
     
     try:
-        timeout = aiohttp.ClientTimeout(total=MEMORY_API_TIMEOUT)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            url = f"{MEMORY_API_ENDPOINT}/api/memory/users/{user_id}/memories"
-            logger.debug(f"Fetching memory from: {url}")
-            async with session.get(url) as response:
-                if response.status == 200:
-                    memory_data = await response.json()
+        url = f"{MEMORY_API_ENDPOINT}/api/memory/users/{user_id}/memories"
+        logger.debug(f"Fetching memory from: {url}")
+        async with asyncio.timeout(MEMORY_API_TIMEOUT):
+            response = await memory_api_session.get(url)
+            if response.status_code == 200:
+                memory_data = orjson.loads(response.content)
+                if logger.isEnabledFor(logging.DEBUG):
                     logger.debug(f"Memory API response: {json.dumps(memory_data, indent=2, default=str)}")
-                    logger.info(f"Successfully fetched memory for user {user_id}")
-                    return memory_data
-                elif response.status == 404:
-                    logger.info(f"No memory found for user {user_id}")
-                    return {}
-                else:
-                    logger.warning(f"Memory API returned status {response.status} for user {user_id}")
-                    return {}
-    except asyncio.TimeoutError:
+                logger.info(f"Successfully fetched memory for user {user_id}")
+                return memory_data
+            elif response.status_code == 404:
+                logger.info(f"No memory found for user {user_id}")
+                return {}
+            else:
+                logger.warning(f"Memory API returned status {response.status_code} for user {user_id}")
+                return {}
+    except (asyncio.TimeoutError, httpx.TimeoutException):
         logger.warning(f"Memory API timeout ({MEMORY_API_TIMEOUT}s) for user {user_id}")
         return {}
     except Exception as e:
         logger.warning(f"Error fetching memory for user {user_id}: {e}")
         return {}
 
+@functools.lru_cache(maxsize=1024)
+def _render_system_prompt(user_memory_key: bytes) -> str:
+    """
+    Render the system prompt for a canonical (sorted-key) JSON encoding of user memory.
+    Results are cached so repeat users with unchanged memory skip template rendering.
+    """
+    user_memory = orjson.loads(user_memory_key)
+    return SYSTEM_PROMPT_TEMPLATE.render(user_memory=user_memory)
+
+
 def generate_system_prompt(user_memory: dict = None) -> str:
     """
     Generate system prompt using Jinja2 template with user memory.
     """
     try:
-        logger.debug(f"Generating system prompt with memory: {json.dumps(user_memory, indent=2, default=str) if user_memory else 'None'}")
-        template = jinja_env.get_template("system_prompt.j2")
-        rendered_prompt = template.render(user_memory=user_memory)
-        logger.debug(f"Generated system prompt: {rendered_prompt}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Generating system prompt with memory: {json.dumps(user_memory, indent=2, default=str) if user_memory else 'None'}")
+        user_memory_key = orjson.dumps(user_memory, option=orjson.OPT_SORT_KEYS, default=str)
+        rendered_prompt = _render_system_prompt(user_memory_key)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Generated system prompt: {rendered_prompt}")
         return rendered_prompt
     except Exception as e:
         logger.error(f"Error generating system prompt: {e}")
@@ -295,21 +402,85 @@ def generate_system_prompt(user_memory: dict = None) -> str:
         logger.debug(f"Using fallback system prompt: {fallback_prompt}")
         return fallback_prompt
 
+def _session_key(session_id: str) -> str:
+    return f"session:{session_id}"
+
+
+def _session_meta_key(session_id: str) -> str:
+    return f"session:{session_id}:meta"
+
+
+def _session_messages_key(session_id: str) -> str:
+    return f"session:{session_id}:messages"
+
+
+# Returns the session document only when it carries the expected "userId" field, an empty string when it
+# belongs to another user and nil when it does not exist, so mismatched documents never leave Redis
+CONVERSATION_OWNER_SCRIPT = """
+local v = redis.call('GET', KEYS[1])
+if not v then return false end
+if string.find(v, ARGV[1], 1, true) or string.find(v, ARGV[2], 1, true) then return v end
+return ''
+"""
+CONVERSATION_OWNER_SCRIPT_SHA = hashlib.sha1(CONVERSATION_OWNER_SCRIPT.encode()).hexdigest()
+
+
+async def _fetch_conversation_parts(session_id: str, user_id: str, cached_script: bool = True) -> list:
+    encoded_user_id = orjson.dumps(user_id)
+    owner_args = (b'"userId":' + encoded_user_id, b'"userId": ' + encoded_user_id)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        if cached_script:
+            pipe.evalsha(CONVERSATION_OWNER_SCRIPT_SHA, 1, _session_key(session_id), *owner_args)
+        else:
+            pipe.eval(CONVERSATION_OWNER_SCRIPT, 1, _session_key(session_id), *owner_args)
+        pipe.hgetall(_session_meta_key(session_id))
+        pipe.lrange(_session_messages_key(session_id), 0, -1)
+        return await pipe.execute()
+
+
+async def load_conversation(session_id: str, user_id: str) -> dict | None:
+    """
+    Load a conversation from Redis in either storage layout with a single round trip.
+
+    Messages from a legacy session:{id} document come first, followed by any messages appended
+    to the session:{id}:messages list, so sessions started before a storage switch stay intact.
+    A legacy document owned by another user is not transferred and comes back with a ``None`` userId.
+    Returns None if the session does not exist.
+    """
+    try:
+        conversation_data, meta, stored_messages = await _fetch_conversation_parts(session_id, user_id)
+    except NoScriptError:
+        # Script cache was flushed (e.g. after failover); EVAL loads it again
+        conversation_data, meta, stored_messages = await _fetch_conversation_parts(session_id, user_id, cached_script=False)
+
+    if conversation_data is None and not meta:
+        return None
+
+    if conversation_data:
+        conversation = orjson.loads(conversation_data)
+    elif conversation_data is None:
+        conversation = {"title": None, "messages": []}
+    else:
+        return {"userId": None, "messages": []}
+    for field, value in meta.items():
+        conversation[field.decode()] = value.decode()
+    if stored_messages:
+        conversation.setdefault("messages", []).extend(orjson.loads(m) for m in stored_messages)
+    return conversation
+
+
 async def get_conversation_history(session_id: str, user_id: str) -> list:
     """
     Retrieve conversation history from Redis.
     Returns a list of messages in OpenAI format for the LLM.
     """
     try:
-        redis_key = f"session:{session_id}"
-        conversation_data = await redis_client.get(redis_key)
+        conversation = await load_conversation(session_id, user_id)
         
-        if not conversation_data:
+        if not conversation:
             logger.info(f"No conversation history found for session {session_id}")
             return []
         
-        conversation = json.loads(conversation_data)
-        
         # Validate session belongs to the user
         if conversation.get("userId") != user_id:
             logger.warning(f"Session {session_id} does not belong to user {user_id}")
@@ -339,19 +510,65 @@ async def get_conversation_history(session_id: str, user_id: str) -> list:
         logger.error(f"Error retrieving conversation history for session {session_id}: {e}")
         return []
 
+async def append_conversation_messages(session_id: str, user_id: str, messages: list, current_time: str):
+    """
+    Append messages to the list-based conversation layout in one pipelined round trip.
+    Writes are O(1) in conversation length. The TTL is refreshed on both keys and on a legacy
+    single-document conversation, whose messages are read first for sessions that span a
+    storage mode switch (EXPIRE on a missing key is a no-op).
+    """
+    meta_key = _session_meta_key(session_id)
+    messages_key = _session_messages_key(session_id)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hsetnx(meta_key, "sessionId", session_id)
+        pipe.hsetnx(meta_key, "userId", user_id)
+        pipe.hsetnx(meta_key, "createdAt", current_time)
+        pipe.hset(meta_key, "lastActivity", current_time)
+        pipe.rpush(messages_key, *(orjson.dumps(msg) for msg in messages))
+        pipe.expire(meta_key, CONVERSATION_TTL_SECONDS)
+        pipe.expire(messages_key, CONVERSATION_TTL_SECONDS)
+        pipe.expire(_session_key(session_id), CONVERSATION_TTL_SECONDS)
+        await pipe.execute()
+
 async def update_conversation_history(session_id: str, user_id: str, user_message: str, assistant_response: str, chat_message_id: str, system_message: str = None):
     """
     Update conversation history in Redis with new user message and assistant response.
     Creates a new conversation if it doesn't exist.
     """
     try:
-        redis_key = f"session:{session_id}"
         current_time = datetime.now(timezone.utc).isoformat()
-          # Get existing conversation or create new one
+        user_msg = {
+            "messageId": f"{chat_message_id}_user",
+            "role": "user",
+            "content": user_message,
+            "timestamp": current_time
+        }
+        assistant_msg = {
+            "messageId": f"{chat_message_id}_assistant",
+            "role": "assistant", 
+            "content": assistant_response,
+            "timestamp": current_time
+        }
+
+        if CONVERSATION_STORAGE_MODE == "list":
+            new_messages = [user_msg, assistant_msg]
+            if system_message:
+                new_messages.insert(0, {
+                    "messageId": f"{chat_message_id}_system",
+                    "role": "system",
+                    "content": system_message,
+                    "timestamp": current_time
+                })
+            await append_conversation_messages(session_id, user_id, new_messages, current_time)
+            logger.info(f"Appended {len(new_messages)} messages to conversation history for session {session_id}")
+            return
+
+        redis_key = _session_key(session_id)
+        # Get existing conversation or create new one
         conversation_data = await redis_client.get(redis_key)
         
         if conversation_data:
-            conversation = json.loads(conversation_data)
+            conversation = orjson.loads(conversation_data)
             logger.info(f"Updating existing conversation for session {session_id}")
         else:
             conversation = {
@@ -376,29 +593,15 @@ async def update_conversation_history(session_id: str, user_id: str, user_messag
         # Update last activity timestamp
         conversation["lastActivity"] = current_time
         
-        # Add user message
-        user_msg = {
-            "messageId": f"{chat_message_id}_user",
-            "role": "user",
-            "content": user_message,
-            "timestamp": current_time
-        }
+        # Add user message and assistant response
         conversation["messages"].append(user_msg)
-        
-        # Add assistant response
-        assistant_msg = {
-            "messageId": f"{chat_message_id}_assistant",
-            "role": "assistant", 
-            "content": assistant_response,
-            "timestamp": current_time
-        }
         conversation["messages"].append(assistant_msg)
         
         # Save back to Redis with 24-hour TTL
         await redis_client.setex(
             redis_key,
-            24 * 60 * 60,  # 24 hours in seconds
-            json.dumps(conversation)
+            CONVERSATION_TTL_SECONDS,
+            orjson.dumps(conversation)
         )
         
         logger.info(f"Updated conversation history for session {session_id} with {len(conversation['messages'])} total messages")
@@ -407,7 +610,7 @@ async def update_conversation_history(session_id: str, user_id: str, user_messag
         logger.error(f"Error updating conversation history for session {session_id}: {e}")
         # Don't raise the exception as this shouldn't stop message processing
 
-async def publish_message_completed_event(sb_client: ServiceBusClient, session_id: str, user_id: str, chat_message_id: str):
+async def publish_message_completed_event(sender, session_id: str, user_id: str, chat_message_id: str):
     """
     Publish a message-completed event to notify other services that a conversation interaction is complete.
     This enables asynchronous processing like history persistence and memory extraction.
@@ -422,20 +625,38 @@ async def publish_message_completed_event(sb_client: ServiceBusClient, session_i
         }
         
         completed_message = ServiceBusMessage(
-            body=json.dumps(completed_payload),
+            body=orjson.dumps(completed_payload),
             session_id=session_id,
             message_id=f"{chat_message_id}_completed"
         )
         
-        async with sb_client.get_topic_sender(SERVICEBUS_MESSAGE_COMPLETED_TOPIC) as sender:
-            await sender.send_messages(completed_message)
-            logger.info(f"Published message-completed event for session {session_id}, chatMessageId {chat_message_id}")
+        await sender.send_messages(completed_message)
+        logger.info(f"Published message-completed event for session {session_id}, chatMessageId {chat_message_id}")
             
     except Exception as e:
         logger.error(f"Error publishing message-completed event for session {session_id}, chatMessageId {chat_message_id}: {e}")
         # Don't raise the exception as this shouldn't stop the main processing flow
 
 
+async def persist_completed_interaction(session_id: str, user_id: str, user_message: str, assistant_response: str,
+                                        chat_message_id: str, system_message: str = None):
+    """
+    Store a finished interaction in Redis and then publish the message-completed event.
+    The event is sent only after the history write so downstream workers read the complete conversation.
+    """
+    async with persistence_semaphore:
+        await update_conversation_history(
+            session_id,
+            user_id,
+            user_message,
+            assistant_response,
+            chat_message_id,
+            system_message
+        )
+        # Publish message-completed event for downstream processing (history, memory, etc.)
+        await publish_message_completed_event(message_completed_sender, session_id, user_id, chat_message_id)
+
+
 def _run_key(run_id: str) -> str:
     return f"run:{run_id}"
 
@@ -449,9 +670,9 @@ async def update_run_metadata(run_id: str, **updates):
     Update run metadata in Redis while preserving existing fields.
     """
     run_data = await redis_client.get(_run_key(run_id))
-    run = json.loads(run_data) if run_data else {"id": run_id, "runId": run_id}
+    run = orjson.loads(run_data) if run_data else {"id": run_id, "runId": run_id}
     run.update({key: value for key, value in updates.items() if value is not None})
-    await redis_client.setex(_run_key(run_id), RUN_TTL_SECONDS, json.dumps(run, ensure_ascii=False))
+    await redis_client.setex(_run_key(run_id), RUN_TTL_SECONDS, orjson.dumps(run))
 
 
 async def append_run_event(run_id: str, thread_id: str, event_type: str, **payload) -> dict:
@@ -462,7 +683,7 @@ async def append_run_event(run_id: str, thread_id: str, event_type: str, **paylo
     event = build_event(event_type, run_id, thread_id, int(sequence), **payload)
     await redis_client.xadd(
         _run_events_key(run_id),
-        {"data": json.dumps(event, ensure_ascii=False, separators=(",", ":"))},
+        {"data": orjson.dumps(event)},
         maxlen=RUN_EVENTS_MAXLEN,
         approximate=True,
     )
@@ -478,29 +699,121 @@ async def is_cancel_requested(run_id: str) -> bool:
     return bool(await redis_client.get(f"run:{run_id}:cancel_requested"))
 
 
-async def publish_legacy_token(sender, session_id: str, chat_message_id: str, token: str) -> None:
+def build_legacy_payload_prefix(session_id: str, chat_message_id: str) -> bytes:
     """
-    Publish a legacy token-stream message for old clients.
+    Pre-encode the fields shared by all legacy token-stream payloads for old clients.
+
+    Returns ``{"sessionId":...,"chatMessageId":...,`` so token and end-of-stream bodies can be
+    produced by appending their last field and a closing brace, without building a dict per message.
     """
-    token_payload = {
-        "sessionId": session_id,
-        "chatMessageId": chat_message_id,
-        "token": token,
-    }
-    token_message = ServiceBusMessage(
-        body=json.dumps(token_payload),
-        session_id=session_id,
-    )
-    await sender.send_messages(token_message)
+    template = orjson.dumps({"sessionId": session_id, "chatMessageId": chat_message_id})
+    return template[:-1] + b","
 
 
-async def publish_legacy_eos(sender, session_id: str, chat_message_id: str) -> None:
+class LegacyTokenPublisher:
     """
-    Publish the legacy end-of-stream sentinel for old clients.
+    Coalesce legacy token-stream messages into Service Bus batches.
+
+    Tokens are queued without blocking the LLM stream loop. A background task sends whatever
+    has accumulated (up to ``TOKEN_BATCH_MAX`` messages) as one ``ServiceBusMessageBatch``, so
+    the first token goes out immediately and later tokens that arrive during a send round-trip
+    share the next AMQP transfer. ``TOKEN_BATCH_MS`` adds an optional linger before each batch.
+    Use as an async context manager; entering borrows a sender from the pool and exiting
+    flushes all queued messages in order before returning it.
     """
-    eos_payload = {"sessionId": session_id, "chatMessageId": chat_message_id, "end_of_stream": True}
-    eos_message = ServiceBusMessage(body=json.dumps(eos_payload), session_id=session_id)
-    await sender.send_messages(eos_message)
+
+    def __init__(self, sender_pool: asyncio.Queue, session_id: str, chat_message_id: str):
+        self._sender_pool = sender_pool
+        self._sender = None
+        self._session_id = session_id
+        self._chat_message_id = chat_message_id
+        payload_prefix = build_legacy_payload_prefix(session_id, chat_message_id)
+        self._token_prefix = payload_prefix + b'"token":'
+        self._eos_body = payload_prefix + b'"end_of_stream":true}'
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = None
+
+    async def __aenter__(self):
+        self._sender = await self._sender_pool.get()
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._queue.put_nowait(None)
+        try:
+            await self._task
+        except Exception as e:
+            if exc_type is None:
+                raise
+            logger.error(f"Failed to flush legacy token stream for chatMessageId {self._chat_message_id}: {e}")
+        finally:
+            self._sender_pool.put_nowait(self._sender)
+        return False
+
+    def publish_token(self, token: str) -> None:
+        """Queue a token message for the legacy stream."""
+        body = self._token_prefix + orjson.dumps(token) + b"}"
+        self._enqueue(ServiceBusMessage(body=body, session_id=self._session_id))
+
+    def publish_eos(self) -> None:
+        """Queue the end-of-stream sentinel after all previously queued tokens."""
+        self._enqueue(ServiceBusMessage(body=self._eos_body, session_id=self._session_id))
+
+    def _enqueue(self, message: ServiceBusMessage) -> None:
+        if self._task.done():
+            # Surface a failed background send on the stream loop instead of queueing forever
+            self._task.result()
+        self._queue.put_nowait(message)
+
+    async def _run(self):
+        """Drain the queue into batches until the None sentinel is received."""
+        # Per-batch Service Bus spans are not worth their cost, so run the sends under an
+        # unsampled span that keeps the trace ID but makes child spans non-recording
+        parent_span_context = trace.get_current_span().get_span_context()
+        if parent_span_context.is_valid:
+            unsampled_span = NonRecordingSpan(SpanContext(
+                trace_id=parent_span_context.trace_id,
+                span_id=parent_span_context.span_id,
+                is_remote=False,
+                trace_flags=TraceFlags(TraceFlags.DEFAULT),
+                trace_state=parent_span_context.trace_state,
+            ))
+            with trace.use_span(unsampled_span, end_on_exit=False):
+                await self._drain()
+        else:
+            await self._drain()
+
+    async def _drain(self):
+        queue = self._queue
+        linger = TOKEN_BATCH_MS / 1000
+        while True:
+            message = await queue.get()
+            if message is None:
+                return
+            if linger:
+                await asyncio.sleep(linger)
+            batch = await self._sender.create_message_batch()
+            stop = False
+            while True:
+                if len(batch) >= TOKEN_BATCH_MAX:
+                    await self._sender.send_messages(batch)
+                    batch = await self._sender.create_message_batch()
+                try:
+                    batch.add_message(message)
+                except MessageSizeExceededError:
+                    await self._sender.send_messages(batch)
+                    batch = await self._sender.create_message_batch()
+                    batch.add_message(message)
+                try:
+                    message = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if message is None:
+                    stop = True
+                    break
+            await self._sender.send_messages(batch)
+            if stop:
+                return
 
 
 async def cancel_run(run_id: str, thread_id: str) -> None:
@@ -663,8 +976,8 @@ async def create_declarative_artifact(run_id: str, thread_id: str, user_id: str,
         return
 
     validate_artifact_profile(artifact)
-    artifact_json = json.dumps(artifact, ensure_ascii=False, separators=(",", ":"))
-    content_hash = f"sha256-{hashlib.sha256(artifact_json.encode('utf-8')).hexdigest()}"
+    artifact_bytes = orjson.dumps(artifact)
+    content_hash = f"sha256-{hashlib.sha256(artifact_bytes).hexdigest()}"
     artifact_id = f"artifact_{uuid.uuid4().hex}"
     blob_path = f"artifacts/{user_id}/{run_id}/{artifact_id}/v1/{blob_filename}"
     created_at = utc_now()
@@ -705,14 +1018,14 @@ async def create_declarative_artifact(run_id: str, thread_id: str, user_id: str,
         blob=blob_path,
     )
     await blob_client.upload_blob(
-        artifact_json.encode("utf-8"),
+        artifact_bytes,
         overwrite=True,
         content_settings=ContentSettings(content_type=artifact["mimeType"]),
     )
-    await redis_client.setex(f"artifact:{artifact_id}", RUN_TTL_SECONDS, json.dumps(manifest, ensure_ascii=False))
+    await redis_client.setex(f"artifact:{artifact_id}", RUN_TTL_SECONDS, orjson.dumps(manifest))
 
     run_data = await redis_client.get(_run_key(run_id))
-    run = json.loads(run_data) if run_data else {}
+    run = orjson.loads(run_data) if run_data else {}
     artifacts = run.get("artifacts", [])
     artifacts.append(artifact_id)
     await update_run_metadata(run_id, artifacts=artifacts)
@@ -725,17 +1038,18 @@ async def create_declarative_artifact(run_id: str, thread_id: str, user_id: str,
         manifest=manifest,
     )
 
-async def process_message(sb_client: ServiceBusClient, service_bus_message):
+async def process_message(service_bus_message):
     """
     Handle a single user message: parse, call LLM, and append typed run events.
     """
     run_id = None
     thread_id = None
-    message_body_str = ""
+    message_body = b""
     try:
-        message_body_str = str(service_bus_message)
-        logger.info(f"Received message: {message_body_str}")
-        message_data = json.loads(message_body_str)
+        message_body = b"".join(service_bus_message.body)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Received message: {message_body.decode('utf-8', errors='replace')}")
+        message_data = orjson.loads(message_body)
         
         user_text = message_data.get("text")
         session_id = message_data.get("sessionId")
@@ -760,10 +1074,13 @@ async def process_message(sb_client: ServiceBusClient, service_bus_message):
         with tracer.start_as_current_span("process_user_message") as span:
             # Add operation-specific attributes manually
             if span.is_recording():
-                span.set_attribute("app.operation", "process_user_message")
-                span.set_attribute("app.user_text_length", len(user_text))
-                span.set_attribute("app.run_id", run_id)
-                span.set_attribute("app.thread_id", thread_id)
+                span.set_attributes({
+                    "app.operation": "process_user_message",
+                    "app.message_id": service_bus_message.message_id,
+                    "app.user_text_length": len(user_text),
+                    "app.run_id": run_id,
+                    "app.thread_id": thread_id,
+                })
 
             logger.info(f"Processing chatMessageId: {chat_message_id} for sessionId: {session_id}, userId: {user_id} - Text: '{user_text}'")
 
@@ -790,8 +1107,15 @@ async def process_message(sb_client: ServiceBusClient, service_bus_message):
                 await cancel_run(run_id, thread_id)
                 return
 
-            # Get conversation history from Redis
-            conversation_history = await get_conversation_history(session_id, user_id)
+            # Load history from Redis and speculatively fetch user memory in parallel;
+            # memory is only needed when the history has no system message yet
+            history_task = asyncio.create_task(get_conversation_history(session_id, user_id))
+            memory_task = asyncio.create_task(fetch_user_memory(user_id))
+            try:
+                conversation_history = await history_task
+            except BaseException:
+                memory_task.cancel()
+                raise
 
             # Build messages for LLM
             messages = []
@@ -805,14 +1129,16 @@ async def process_message(sb_client: ServiceBusClient, service_bus_message):
             if not has_system_message_in_history:
                 # This is a new conversation, fetch user memory and generate system prompt
                 logger.debug("New conversation detected, fetching user memory for system prompt")
-                user_memory = await fetch_user_memory(user_id)
-                logger.debug(f"Fetched user memory for user {user_id}: {json.dumps(user_memory, indent=2, default=str) if user_memory else 'Empty'}")
+                user_memory = await memory_task
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Fetched user memory for user {user_id}: {json.dumps(user_memory, indent=2, default=str) if user_memory else 'Empty'}")
                 system_message_content = generate_system_prompt(user_memory)
                 
                 # Add system message with memory context
                 messages.append({"role": "system", "content": system_message_content})
                 logger.debug("Added system message with user memory context")
             else:
+                memory_task.cancel()
                 logger.debug("System message already present in conversation history")
                 system_message_content = None  # Don't store system message for existing conversations
             
@@ -822,9 +1148,10 @@ async def process_message(sb_client: ServiceBusClient, service_bus_message):
             
             # Add current user message
             messages.append({"role": "user", "content": user_text})
-            logger.debug(f"Built messages for LLM: {len(messages)} total messages")
-            # Debug: Log the complete messages array as JSON
-            logger.debug(f"Messages sent to LLM: {json.dumps(messages, indent=2, default=str)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Built messages for LLM: {len(messages)} total messages")
+                # Debug: Log the complete messages array as JSON
+                logger.debug(f"Messages sent to LLM: {json.dumps(messages, indent=2, default=str)}")
 
             logger.info(f"Calling LLM with {len(messages)} messages (including system message and history)")
             if await is_cancel_requested(run_id):
@@ -836,112 +1163,128 @@ async def process_message(sb_client: ServiceBusClient, service_bus_message):
                 messages=messages,
                 stream=True,
                 stream_options={"include_usage": True},  # Include token usage in the stream
-                tools=[conversation_search_tool],
+                tools=CHAT_TOOLS,
                 tool_choice="auto",
-                temperature=0.7
+                temperature=0.7,
+                **COMPLETION_LIMITS
             )
 
         # Collect the full assistant response and handle function calls
-        assistant_response_tokens = []
+        assistant_response_buf = io.StringIO()
         function_calls = {}
         usage_info = None
         run_terminal_sent = False
 
-        async with sb_client.get_topic_sender(SERVICEBUS_TOKEN_STREAMS_TOPIC) as sender:
+        # Bind hot-path callables once; the stream loops below run once per token
+        write_response = assistant_response_buf.write
+        emit_event = append_run_event
+        token_chunks_sent = 0
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+
+        async with LegacyTokenPublisher(token_stream_senders, session_id, chat_message_id) as token_publisher:
+            publish_token = token_publisher.publish_token
             async for chunk in stream:
                 if await is_cancel_requested(run_id):
                    await cancel_run(run_id, thread_id)
-                   await publish_legacy_eos(sender, session_id, chat_message_id)
+                   token_publisher.publish_eos()
                    run_terminal_sent = True
                    return
 
-                if chunk.usage:
-                   usage_info = chunk.usage
+                usage = chunk.usage
+                if usage:
+                   usage_info = usage
                    usage_payload = {
-                       "inputTokens": chunk.usage.prompt_tokens,
-                       "outputTokens": chunk.usage.completion_tokens,
-                       "totalTokens": chunk.usage.total_tokens,
+                       "inputTokens": usage.prompt_tokens,
+                       "outputTokens": usage.completion_tokens,
+                       "totalTokens": usage.total_tokens,
                    }
                    await append_run_event(run_id, thread_id, "Usage", usage=usage_payload)
                    await update_run_metadata(run_id, usage=usage_payload)
-                   logger.info(f"Token usage: input={chunk.usage.prompt_tokens}, output={chunk.usage.completion_tokens}, total={chunk.usage.total_tokens}")
+                   logger.info(f"Token usage: input={usage.prompt_tokens}, output={usage.completion_tokens}, total={usage.total_tokens}")
 
-                if chunk.choices and len(chunk.choices) > 0:
-                   choice = chunk.choices[0]
-                   delta = choice.delta
+                choices = chunk.choices
+                if choices:
+                   delta = choices[0].delta
 
-                   if delta.content:
-                       content_chunk = delta.content
-                       assistant_response_tokens.append(content_chunk)
-                       await append_run_event(
+                   content_chunk = delta.content
+                   if content_chunk:
+                       write_response(content_chunk)
+                       await emit_event(
                            run_id,
                            thread_id,
                            "TextMessageContent",
                            messageId=assistant_message_id,
                            delta=content_chunk,
                        )
-                       await publish_legacy_token(sender, session_id, chat_message_id, content_chunk)
-                       logger.debug(f"Sent token chunk: {content_chunk}")
+                       publish_token(content_chunk)
+                       token_chunks_sent += 1
 
                    if delta.tool_calls:
                        for tool_call in delta.tool_calls:
-                           logger.debug(f"Tool call delta: index={tool_call.index}, id={tool_call.id}, function={tool_call.function}")
+                           if debug_enabled:
+                               logger.debug(f"Tool call delta: index={tool_call.index}, id={tool_call.id}, function={tool_call.function}")
 
                            tool_call_index = tool_call.index
-                           if tool_call_index not in function_calls:
-                               function_calls[tool_call_index] = {
+                           fc = function_calls.get(tool_call_index)
+                           if fc is None:
+                               fc = function_calls[tool_call_index] = {
                                    "id": "",
                                    "index": tool_call_index,
                                    "name": "",
-                                   "arguments": "",
+                                   "arguments": io.StringIO(),
                                    "started": False,
                                }
-                               logger.debug(f"Initialized function call at index {tool_call_index}")
+                               if debug_enabled:
+                                   logger.debug(f"Initialized function call at index {tool_call_index}")
 
                            if tool_call.id:
-                               function_calls[tool_call_index]["id"] = tool_call.id
+                               fc["id"] = tool_call.id
 
-                           if tool_call.function:
-                               if tool_call.function.name:
-                                   function_calls[tool_call_index]["name"] = tool_call.function.name
-                                   if not function_calls[tool_call_index]["started"]:
+                           fn = tool_call.function
+                           if fn:
+                               if fn.name:
+                                   fc["name"] = fn.name
+                                   if not fc["started"]:
                                        await append_run_event(
                                            run_id,
                                            thread_id,
                                            "ToolCallStart",
                                            messageId=assistant_message_id,
-                                           toolCallId=function_calls[tool_call_index]["id"] or f"call_index_{tool_call_index}",
-                                           name=tool_call.function.name,
+                                           toolCallId=fc["id"] or f"call_index_{tool_call_index}",
+                                           name=fn.name,
                                        )
-                                       function_calls[tool_call_index]["started"] = True
+                                       fc["started"] = True
 
-                               if tool_call.function.arguments is not None:
-                                   function_calls[tool_call_index]["arguments"] += tool_call.function.arguments
+                               if fn.arguments is not None:
+                                   fc["arguments"].write(fn.arguments)
                                    await append_run_event(
                                        run_id,
                                        thread_id,
                                        "ToolCallArgs",
                                        messageId=assistant_message_id,
-                                       toolCallId=function_calls[tool_call_index]["id"] or f"call_index_{tool_call_index}",
-                                       delta=tool_call.function.arguments,
+                                       toolCallId=fc["id"] or f"call_index_{tool_call_index}",
+                                       delta=fn.arguments,
                                    )
 
             if function_calls:
                 logger.info(f"Processing {len(function_calls)} function calls")
-                logger.debug(f"Complete function calls state: {function_calls}")
-
-                # Convert function_calls dict to list for processing
+                # Convert function_calls dict to list for processing and materialize streamed arguments
                 function_calls_list = list(function_calls.values())
-                  # Log each function call for debugging
-                for i, func_call in enumerate(function_calls_list):
-                    logger.debug(f"Function call {i}: name='{func_call['name']}', id='{func_call['id']}', args='{func_call['arguments'][:100]}{'...' if len(func_call['arguments']) > 100 else ''}'")
+                for func_call in function_calls_list:
+                    func_call["arguments"] = func_call["arguments"].getvalue()
+                if debug_enabled:
+                    logger.debug(f"Complete function calls state: {function_calls}")
+                    # Log each function call for debugging
+                    for i, func_call in enumerate(function_calls_list):
+                        logger.debug(f"Function call {i}: name='{func_call['name']}', id='{func_call['id']}', args='{func_call['arguments'][:100]}{'...' if len(func_call['arguments']) > 100 else ''}'")
                 
                 # Post-process function calls to ensure proper IDs and validation
                 for func_call in function_calls_list:
                     # If ID is empty, generate one based on index
                     if not func_call["id"] or func_call["id"].strip() == "":
                         func_call["id"] = f"call_index_{func_call['index']}"
-                        logger.debug(f"Generated ID for tool call at index {func_call['index']}: {func_call['id']}")
+                        if debug_enabled:
+                            logger.debug(f"Generated ID for tool call at index {func_call['index']}: {func_call['id']}")
 
                     await append_run_event(
                         run_id,
@@ -970,7 +1313,8 @@ async def process_message(sb_client: ServiceBusClient, service_bus_message):
                         }
                     }
                     assistant_tool_calls.append(tool_call_dict)
-                    logger.debug(f"Added valid tool call: {func_call['name']} with ID {func_call['id']}")
+                    if debug_enabled:
+                        logger.debug(f"Added valid tool call: {func_call['name']} with ID {func_call['id']}")
                 # Only proceed if we have valid tool calls
                 if not assistant_tool_calls:
                     logger.warning("No valid tool calls found after filtering, skipping function call processing")
@@ -982,25 +1326,30 @@ async def process_message(sb_client: ServiceBusClient, service_bus_message):
                         "tool_calls": assistant_tool_calls
                     }
                     messages.append(assistant_message)
-                    logger.debug(f"Added assistant message with {len(assistant_tool_calls)} tool calls")
+                    if debug_enabled:
+                        logger.debug(f"Added assistant message with {len(assistant_tool_calls)} tool calls")
 
-                    # Execute function calls and add tool responses
-                    for func_call in function_calls_list:
-                       if await is_cancel_requested(run_id):
-                           await cancel_run(run_id, thread_id)
-                           await publish_legacy_eos(sender, session_id, chat_message_id)
-                           run_terminal_sent = True
-                           return
+                    if await is_cancel_requested(run_id):
+                        await cancel_run(run_id, thread_id)
+                        token_publisher.publish_eos()
+                        run_terminal_sent = True
+                        return
 
+                    # Parse every function call and start the searches concurrently; each entry holds
+                    # the search task or the exception raised while preparing it
+                    tool_executions = []
+                    for func_call in function_calls_list:
                        # Skip tool calls with empty names (IDs are guaranteed to be set by post-processing)
                        if not func_call["name"] or func_call["name"].strip() == "":
                            logger.warning(f"Skipping invalid tool call during execution: {func_call}")
                            continue
-                       logger.debug(f"Processing function call: {func_call}")
+                       if debug_enabled:
+                           logger.debug(f"Processing function call: {func_call}")
 
                        if func_call["name"] == "search_conversation_history":
                            try:
-                               logger.debug(f"Raw function arguments: '{func_call['arguments']}'")
+                               if debug_enabled:
+                                   logger.debug(f"Raw function arguments: '{func_call['arguments']}'")
 
                                # Parse arguments with better error handling
                                if not func_call["arguments"] or func_call["arguments"].strip() == "":
@@ -1008,8 +1357,8 @@ async def process_message(sb_client: ServiceBusClient, service_bus_message):
                                    args = {}
                                else:
                                    try:
-                                       args = json.loads(func_call["arguments"])
-                                   except json.JSONDecodeError as parse_error:
+                                       args = orjson.loads(func_call["arguments"])
+                                   except orjson.JSONDecodeError as parse_error:
                                        logger.error(f"Failed to parse JSON arguments '{func_call['arguments']}': {parse_error}")
                                        raise parse_error
 
@@ -1017,67 +1366,81 @@ async def process_message(sb_client: ServiceBusClient, service_bus_message):
                                limit = args.get("limit", 5)
 
                                logger.info(f"Executing conversation search: query='{search_query}', limit={limit}")
-
-                               # Execute the search
-                               search_result = await search_conversation_history(user_id, search_query, limit)
-                               await append_run_event(
-                                   run_id,
-                                   thread_id,
-                                   "ToolCallResult",
-                                   messageId=assistant_message_id,
-                                   toolCallId=func_call["id"],
-                                   result=search_result,
-                               )
-
-                               # Add tool message to conversation
-                               tool_message = {
-                                   "role": "tool",
-                                   "content": json.dumps(search_result, indent=2),
-                                   "tool_call_id": func_call["id"],
-                               }
-                               messages.append(tool_message)
-
-                               logger.info(f"Function call result: Found {search_result.get('total_found', 0)} conversations")
-
-                           except json.JSONDecodeError as e:
-                               logger.error(f"Error parsing function arguments '{func_call['arguments']}': {e}")
-                               error_payload = {"message": f"Invalid function arguments: {str(e)}"}
-                               await append_run_event(
-                                   run_id,
-                                   thread_id,
-                                   "ToolCallResult",
-                                   messageId=assistant_message_id,
-                                   toolCallId=func_call["id"],
-                                   error=error_payload,
-                               )
-                               error_message = {
-                                   "role": "tool",
-                                   "content": json.dumps({"error": f"Invalid function arguments: {str(e)}"}),
-                                   "tool_call_id": func_call["id"],
-                               }
-                               messages.append(error_message)
+                               execution = asyncio.create_task(search_conversation_history(user_id, search_query, limit))
                            except Exception as e:
-                               logger.error(f"Error executing function call: {e}")
-                               await append_run_event(
-                                   run_id,
-                                   thread_id,
-                                   "ToolCallResult",
-                                   messageId=assistant_message_id,
-                                   toolCallId=func_call["id"],
-                                   error={"message": str(e)},
-                               )
-                               error_message = {
-                                   "role": "tool",
-                                   "content": json.dumps({"error": str(e)}),
-                                   "tool_call_id": func_call["id"],
-                               }
-                               messages.append(error_message)
+                               execution = e
+                           tool_executions.append((func_call, execution))
+
+                    # Add tool responses in call order so they line up with the assistant tool_calls
+                    try:
+                        for func_call, execution in tool_executions:
+                            try:
+                                if isinstance(execution, Exception):
+                                    raise execution
+                                search_result = await execution
+                                await append_run_event(
+                                    run_id,
+                                    thread_id,
+                                    "ToolCallResult",
+                                    messageId=assistant_message_id,
+                                    toolCallId=func_call["id"],
+                                    result=search_result,
+                                )
+
+                                # Add tool message to conversation
+                                tool_message = {
+                                    "role": "tool",
+                                    "content": orjson.dumps(search_result).decode(),
+                                    "tool_call_id": func_call["id"],
+                                }
+                                messages.append(tool_message)
+
+                                logger.info(f"Function call result: Found {search_result.get('total_found', 0)} conversations")
+
+                            except orjson.JSONDecodeError as e:
+                                logger.error(f"Error parsing function arguments '{func_call['arguments']}': {e}")
+                                error_payload = {"message": f"Invalid function arguments: {str(e)}"}
+                                await append_run_event(
+                                    run_id,
+                                    thread_id,
+                                    "ToolCallResult",
+                                    messageId=assistant_message_id,
+                                    toolCallId=func_call["id"],
+                                    error=error_payload,
+                                )
+                                error_message = {
+                                    "role": "tool",
+                                    "content": orjson.dumps({"error": f"Invalid function arguments: {str(e)}"}).decode(),
+                                    "tool_call_id": func_call["id"],
+                                }
+                                messages.append(error_message)
+                            except Exception as e:
+                                logger.error(f"Error executing function call: {e}")
+                                await append_run_event(
+                                    run_id,
+                                    thread_id,
+                                    "ToolCallResult",
+                                    messageId=assistant_message_id,
+                                    toolCallId=func_call["id"],
+                                    error={"message": str(e)},
+                                )
+                                error_message = {
+                                    "role": "tool",
+                                    "content": orjson.dumps({"error": str(e)}).decode(),
+                                    "tool_call_id": func_call["id"],
+                                }
+                                messages.append(error_message)
+                    finally:
+                        # Cancel searches left pending when awaiting is interrupted (run cancellation or shutdown)
+                        for _, execution in tool_executions:
+                            if isinstance(execution, asyncio.Task) and not execution.done():
+                                execution.cancel()
                     
                     # Make another LLM call with the function results
                     logger.info("Making follow-up LLM call with function results")
                     if await is_cancel_requested(run_id):
                         await cancel_run(run_id, thread_id)
-                        await publish_legacy_eos(sender, session_id, chat_message_id)
+                        token_publisher.publish_eos()
                         run_terminal_sent = True
                         return
 
@@ -1086,65 +1449,78 @@ async def process_message(sb_client: ServiceBusClient, service_bus_message):
                         messages=messages,
                         stream=True,
                         stream_options={"include_usage": True},
-                        tools=[conversation_search_tool],
+                        tools=CHAT_TOOLS,
                         tool_choice="auto",
-                        temperature=0.7
+                        temperature=0.7,
+                        **COMPLETION_LIMITS
                     )                
                     # Process the follow-up response
                     async for chunk in followup_stream:
                         if await is_cancel_requested(run_id):
                             await cancel_run(run_id, thread_id)
-                            await publish_legacy_eos(sender, session_id, chat_message_id)
+                            token_publisher.publish_eos()
                             run_terminal_sent = True
                             return
 
-                        if chunk.usage:
-                            usage_info = chunk.usage  # Update usage info with follow-up call
+                        usage = chunk.usage
+                        if usage:
+                            usage_info = usage  # Update usage info with follow-up call
                             usage_payload = {
-                                "inputTokens": chunk.usage.prompt_tokens,
-                                "outputTokens": chunk.usage.completion_tokens,
-                                "totalTokens": chunk.usage.total_tokens,
+                                "inputTokens": usage.prompt_tokens,
+                                "outputTokens": usage.completion_tokens,
+                                "totalTokens": usage.total_tokens,
                             }
                             await append_run_event(run_id, thread_id, "Usage", usage=usage_payload)
                             await update_run_metadata(run_id, usage=usage_payload)
-                            logger.info(f"Follow-up Token usage: input={chunk.usage.prompt_tokens}, output={chunk.usage.completion_tokens}, total={chunk.usage.total_tokens}")
-
-                        if chunk.choices and len(chunk.choices) > 0 and chunk.choices[0].delta and chunk.choices[0].delta.content:
-                            content_chunk = chunk.choices[0].delta.content
-                            assistant_response_tokens.append(content_chunk)
-                            await append_run_event(
-                                run_id,
-                                thread_id,
-                                "TextMessageContent",
-                                messageId=assistant_message_id,
-                                delta=content_chunk,
-                            )
-                            await publish_legacy_token(sender, session_id, chat_message_id, content_chunk)
-                            logger.debug(f"Sent follow-up token chunk: {content_chunk}")
+                            logger.info(f"Follow-up Token usage: input={usage.prompt_tokens}, output={usage.completion_tokens}, total={usage.total_tokens}")
+
+                        # Role-only, finish and usage-only chunks carry no content
+                        choices = chunk.choices
+                        if not choices:
+                            continue
+                        delta = choices[0].delta
+                        if not delta:
+                            continue
+                        content_chunk = delta.content
+                        if not content_chunk:
+                            continue
+
+                        write_response(content_chunk)
+                        await emit_event(
+                            run_id,
+                            thread_id,
+                            "TextMessageContent",
+                            messageId=assistant_message_id,
+                            delta=content_chunk,
+                        )
+                        publish_token(content_chunk)
+                        token_chunks_sent += 1
 
             await create_declarative_artifact(run_id, thread_id, user_id, user_text)
             await append_run_event(run_id, thread_id, "TextMessageEnd", messageId=assistant_message_id)
             await append_run_event(run_id, thread_id, "RunFinished", status="completed")
-            await publish_legacy_eos(sender, session_id, chat_message_id)
+            token_publisher.publish_eos()
             run_terminal_sent = True
+            logger.debug(f"Sent {token_chunks_sent} token chunks for chatMessageId {chat_message_id}")
             logger.info(f"Sent end-of-stream for chatMessageId {chat_message_id}")
 
         # Update conversation history in Redis with the complete interaction
-        assistant_response = "".join(assistant_response_tokens)
+        assistant_response = assistant_response_buf.getvalue()
         
         # Pass system message content only if this is a new conversation (no history)
         system_msg_to_store = system_message_content if not has_system_message_in_history else None
         
-        await update_conversation_history(
-            session_id, 
-            user_id, 
-            user_text, 
-            assistant_response, 
+        # Persist and publish the message-completed event in the background so the worker slot frees up
+        task = asyncio.create_task(persist_completed_interaction(
+            session_id,
+            user_id,
+            user_text,
+            assistant_response,
             chat_message_id,
             system_msg_to_store
-        )
-          # Publish message-completed event for downstream processing (history, memory, etc.)
-        await publish_message_completed_event(sb_client, session_id, user_id, chat_message_id)
+        ))
+        persistence_tasks.add(task)
+        task.add_done_callback(persistence_tasks.discard)
         await update_run_metadata(
            run_id,
            status="completed",
@@ -1152,13 +1528,14 @@ async def process_message(sb_client: ServiceBusClient, service_bus_message):
            outputSummary=assistant_response[:500],
         )
 
-    except json.JSONDecodeError as e:
-        # Create an error span that will also get context attributes
-        with tracer.start_as_current_span("process_message_json_error") as error_span:
-            if error_span.is_recording():
-                error_span.set_attribute("app.error", "json_decode_error")
-                error_span.set_attribute("app.operation", "process_message")
-        logger.error(f"Failed to decode JSON from user message: {message_body_str}, error: {e}")
+    except orjson.JSONDecodeError as e:
+        # Record a leaf error span without activating it; it still gets context attributes
+        error_span = tracer.start_span("process_message_json_error")
+        if error_span.is_recording():
+            error_span.set_attribute("app.error", "json_decode_error")
+            error_span.set_attribute("app.operation", "process_message")
+        error_span.end()
+        logger.error(f"Failed to decode JSON from user message: {message_body!r}, error: {e}")
         # Potentially dead-letter the message
     except Exception as e:
         if run_id and thread_id and redis_client:
@@ -1174,49 +1551,182 @@ async def process_message(sb_client: ServiceBusClient, service_bus_message):
             except Exception as event_error:
                 logger.error(f"Failed to emit RunError for run {run_id}: {event_error}")
 
-        # Create an error span that will also get context attributes
-        with tracer.start_as_current_span("process_message_error") as error_span:
-            if error_span.is_recording():
-                error_span.set_attribute("app.error", "processing_error")
-                error_span.set_attribute("app.operation", "process_message")
-                if run_id:
-                    error_span.set_attribute("app.run_id", run_id)
+        # Record a leaf error span without activating it; it still gets context attributes
+        error_span = tracer.start_span("process_message_error")
+        if error_span.is_recording():
+            error_span.set_attribute("app.error", "processing_error")
+            error_span.set_attribute("app.operation", "process_message")
+            if run_id:
+                error_span.set_attribute("app.run_id", run_id)
+        error_span.end()
         logger.error(f"Error processing message (id: {service_bus_message.message_id if service_bus_message else 'N/A'}): {e}")
         # Potentially re-raise or handle to allow the message to be abandoned/dead-lettered by the caller
         raise
 
-async def _process_and_handle_message(sb_client: ServiceBusClient, msg: ServiceBusMessage, receiver, semaphore: asyncio.Semaphore, logger_instance: logging.Logger):
+async def acquire_processing_slot():
+    """
+    Wait until the number of in-flight messages is below the concurrency limit and claim a slot.
+    """
+    global _active
+    async with _cond:
+        await _cond.wait_for(lambda: _active < _max_concurrent)
+        _active += 1
+
+
+async def release_processing_slot():
+    """
+    Release a processing slot and wake up one waiter.
+    """
+    global _active
+    async with _cond:
+        _active -= 1
+        _cond.notify(1)
+
+
+async def set_max_concurrency(n: int):
+    """
+    Resize the concurrency limit at runtime without restarting the worker.
+    The effective limit cannot exceed the worker pool size (MAX_CONCURRENCY).
+
+    Args:
+        n: New maximum number of messages processed concurrently (minimum 1)
+    """
+    global _max_concurrent
+    async with _cond:
+        _max_concurrent = max(1, n)
+        _cond.notify_all()
+    logger.info(f"Maximum concurrency for message processing set to {_max_concurrent}")
+
+
+async def _complete_message(receiver, msg: ServiceBusMessage, logger_instance: logging.Logger):
     """
-    Process a message, settle it, and release the concurrency semaphore.
+    Complete a processed message under the settlement semaphore.
+    """
+    async with settlement_semaphore:
+        try:
+            await receiver.complete_message(msg)
+            logger_instance.info(f"Successfully processed and completed message id: {msg.message_id}")
+        except Exception as e:
+            logger_instance.error(f"Failed to complete message {msg.message_id}. Error: {e}")
+
+
+def _schedule_completion(receiver, msg: ServiceBusMessage, logger_instance: logging.Logger):
+    """
+    Complete a message in the background so the worker slot is freed as soon as the stream ends.
+    """
+    task = asyncio.create_task(_complete_message(receiver, msg, logger_instance))
+    settlement_tasks.add(task)
+    task.add_done_callback(settlement_tasks.discard)
+
+
+async def _process_and_handle_message(msg: ServiceBusMessage, receiver, logger_instance: logging.Logger):
+    """
+    Process a message, settle it, and release the processing slot.
     """
     try:
-        # Process the message within a span that will get application attributes
-        with tracer.start_as_current_span("handle_service_bus_message") as handle_span:
-            if handle_span.is_recording():
-                handle_span.set_attribute("app.message_id", msg.message_id)
-                handle_span.set_attribute("app.operation", "handle_service_bus_message")
-            
-            # Process the message - this will set context variables and create child spans
-            await process_message(sb_client, msg)
-            
-        await receiver.complete_message(msg) # Reverted to use receiver.complete_message()
-        logger_instance.info(f"Successfully processed and completed message id: {msg.message_id}")
+        # process_message opens the single per-message span (process_user_message)
+        await process_message(msg)
+        _schedule_completion(receiver, msg, logger_instance)
     except Exception as e:
         logger_instance.error(f"Unhandled exception during message processing for msg_id {msg.message_id}. Error: {e}. Abandoning message.")
         
-        # Create an error span that will also get context attributes if they were set
-        with tracer.start_as_current_span("handle_service_bus_message_error") as error_span:
-            if error_span.is_recording():
-                error_span.set_attribute("app.message_id", msg.message_id)
-                error_span.set_attribute("app.operation", "handle_service_bus_message_error")
-                error_span.set_attribute("app.error", str(e))
-            
-            try:
-                await receiver.abandon_message(msg) # Reverted to use receiver.abandon_message()
-            except Exception as abandon_e:
-                logger_instance.error(f"Failed to abandon message {msg.message_id}. Error: {abandon_e}")
+        # Record a leaf error span that will also get context attributes if they were set
+        error_span = tracer.start_span("handle_service_bus_message_error")
+        if error_span.is_recording():
+            error_span.set_attributes({
+                "app.message_id": msg.message_id,
+                "app.operation": "handle_service_bus_message_error",
+                "app.error": str(e),
+            })
+        error_span.end()
+        
+        try:
+            async with settlement_semaphore:
+                await receiver.abandon_message(msg)
+        except Exception as abandon_e:
+            logger_instance.error(f"Failed to abandon message {msg.message_id}. Error: {abandon_e}")
     finally:
-        semaphore.release()
+        await release_processing_slot()
+
+async def abandon_messages(pending: list, logger_instance: logging.Logger):
+    """
+    Abandon messages concurrently so they can be picked up by another worker instance.
+
+    Args:
+        pending: List of ``(receiver, msg)`` pairs to abandon
+        logger_instance: Logger used to report failures
+    """
+    if not pending:
+        return
+
+    async def _abandon(receiver, msg):
+        async with settlement_semaphore:
+            await receiver.abandon_message(msg)
+
+    results = await asyncio.gather(*(_abandon(receiver, msg) for receiver, msg in pending), return_exceptions=True)
+    for (_, msg), result in zip(pending, results):
+        if isinstance(result, Exception):
+            logger_instance.error(f"Failed to abandon message {msg.message_id}. Error: {result}")
+    logger_instance.info(f"Abandoned {len(pending)} unprocessed messages")
+
+
+def _drain_work_queue(work_queue: asyncio.Queue) -> list:
+    """
+    Remove queued messages that have not started processing and return them as ``(receiver, msg)`` pairs.
+    """
+    pending = []
+    while True:
+        try:
+            item = work_queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return pending
+        work_queue.task_done()
+        if item is not None:
+            pending.append(item)
+
+
+async def _worker(work_queue: asyncio.Queue):
+    """
+    Persistent consumer that processes received messages from the work queue.
+
+    Each queue item is a ``(receiver, msg)`` tuple so messages are settled on the receiver
+    they were received on. A ``None`` item stops the worker.
+    """
+    while True:
+        item = await work_queue.get()
+        try:
+            if item is None:
+                return
+            receiver, msg = item
+            await acquire_processing_slot()
+            await _process_and_handle_message(msg, receiver, logger)
+        finally:
+            work_queue.task_done()
+
+
+async def _enqueue_stop_sentinels(work_queue: asyncio.Queue, count: int):
+    """
+    Enqueue one ``None`` sentinel per worker so workers exit after draining queued messages.
+    """
+    for _ in range(count):
+        await work_queue.put(None)
+
+
+async def stop_workers(work_queue: asyncio.Queue, workers: list, timeout: int = 240):
+    """
+    Stop the worker pool once in-flight messages finish, then flush background persistence and settlements.
+
+    Args:
+        work_queue: Queue feeding the worker pool
+        workers: Worker tasks to stop
+        timeout: Maximum time to wait for in-flight messages in seconds
+    """
+    if not all(worker.done() for worker in workers):
+        stop_task = asyncio.create_task(_enqueue_stop_sentinels(work_queue, len(workers)))
+        await wait_for_tasks_completion({stop_task, *workers}, timeout=timeout)
+    await wait_for_tasks_completion(set(persistence_tasks), timeout=30)
+    await wait_for_tasks_completion(set(settlement_tasks), timeout=30)
+
 
 async def setup_signal_handlers():
     """
@@ -1243,6 +1753,28 @@ async def setup_signal_handlers():
             logger.warning(f"Signal handler for {sig} not supported on this platform, using fallback")
             signal.signal(sig, lambda s, f: signal_handler())
 
+async def keep_credentials_warm(credential_scopes: list):
+    """
+    Periodically request tokens so that credential refreshes happen in the background.
+
+    Credentials return cached tokens until they approach expiry, so each call is cheap; once a
+    token enters its refresh window the Entra ID round trip lands here instead of on an LLM call
+    or Service Bus operation.
+
+    Args:
+        credential_scopes: List of ``(credential, scope)`` pairs to keep warm
+    """
+    while not shutdown_event.is_set():
+        for credential, scope in credential_scopes:
+            try:
+                await credential.get_token(scope)
+            except Exception as e:
+                logger.warning(f"Failed to refresh token for scope {scope}: {e}")
+        try:
+            await asyncio.wait_for(shutdown_event.wait(), timeout=CREDENTIAL_REFRESH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
 async def wait_for_tasks_completion(active_tasks: set, timeout: int = 240):
     """
     Wait for all active tasks to complete within the given timeout.
@@ -1254,20 +1786,16 @@ async def wait_for_tasks_completion(active_tasks: set, timeout: int = 240):
         return
     
     logger.info(f"Waiting for {len(active_tasks)} active tasks to complete (timeout: {timeout}s)...")
-    try:
-        await asyncio.wait_for(
-            asyncio.gather(*active_tasks, return_exceptions=True),
-            timeout=timeout
-        )
+    _, pending = await asyncio.wait(active_tasks, timeout=timeout, return_when=asyncio.ALL_COMPLETED)
+    if not pending:
         logger.info("All active tasks completed successfully")
-    except asyncio.TimeoutError:
-        logger.warning(f"Timeout reached ({timeout}s). Some tasks may not have completed.")
-        # Cancel remaining tasks
-        for task in active_tasks:
-            if not task.done():
-                task.cancel()
-        # Wait a bit for cancellation to take effect
-        await asyncio.sleep(1)
+        return
+
+    logger.warning(f"Timeout reached ({timeout}s). Cancelling {len(pending)} tasks that did not complete.")
+    for task in pending:
+        task.cancel()
+    # Wait for cancellation to take effect so shutdown is deterministic
+    await asyncio.gather(*pending, return_exceptions=True)
 
 async def search_conversation_history(user_id: str, search_query: str, limit: int = 5) -> dict:
     """
@@ -1284,47 +1812,49 @@ async def search_conversation_history(user_id: str, search_query: str, limit: in
         return {"conversations": [], "message": "Empty search query provided"}
     
     try:
-        timeout = aiohttp.ClientTimeout(total=MEMORY_API_TIMEOUT)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            url = f"{MEMORY_API_ENDPOINT}/api/memory/users/{user_id}/conversations/search"
-            payload = {
-                "query": search_query.strip(),
-                "limit": max(1, min(10, limit))  # Ensure limit is between 1 and 10
-            }
-            
+        url = f"{MEMORY_API_ENDPOINT}/api/memory/users/{user_id}/conversations/search"
+        payload = {
+            "query": search_query.strip(),
+            "limit": max(1, min(10, limit))  # Ensure limit is between 1 and 10
+        }
+        
+        if logger.isEnabledFor(logging.DEBUG):
             logger.debug(f"Searching conversation history: {url}, payload: {payload}")
-            async with session.post(url, json=payload) as response:
-                if response.status == 200:
-                    conversations = await response.json()
-                    logger.info(f"Found {len(conversations)} relevant conversations for user {user_id}")
-                    
-                    # Format the response for the LLM
-                    formatted_conversations = []
-                    for conv in conversations:
-                        formatted_conv = {
-                            "summary": conv["summary"],
-                            "themes": conv["themes"],
-                            "timestamp": conv["timestamp"],
-                            "relevance_score": conv.get("relevance_score", 0.0),
-                            "user_sentiment": conv.get("user_sentiment", "neutral"),
-                            "persons_mentioned": conv.get("persons", []),
-                            "places_mentioned": conv.get("places", [])
-                        }
-                        formatted_conversations.append(formatted_conv)
-                    
-                    return {
-                        "conversations": formatted_conversations,
-                        "total_found": len(conversations),
-                        "search_query": search_query
+        async with asyncio.timeout(MEMORY_API_TIMEOUT):
+            response = await memory_api_session.post(
+                url, content=orjson.dumps(payload), headers={"Content-Type": "application/json"}
+            )
+            if response.status_code == 200:
+                conversations = orjson.loads(response.content)
+                logger.info(f"Found {len(conversations)} relevant conversations for user {user_id}")
+                
+                # Format the response for the LLM
+                formatted_conversations = []
+                for conv in conversations:
+                    formatted_conv = {
+                        "summary": conv["summary"],
+                        "themes": conv["themes"],
+                        "timestamp": conv["timestamp"],
+                        "relevance_score": conv.get("relevance_score", 0.0),
+                        "user_sentiment": conv.get("user_sentiment", "neutral"),
+                        "persons_mentioned": conv.get("persons", []),
+                        "places_mentioned": conv.get("places", [])
                     }
-                elif response.status == 404:
-                    logger.info(f"No conversation history found for user {user_id}")
-                    return {"conversations": [], "message": "No previous conversations found"}
-                else:
-                    logger.warning(f"Memory API returned status {response.status} for conversation search")
-                    return {"conversations": [], "message": f"Search failed with status {response.status}"}
-                    
-    except asyncio.TimeoutError:
+                    formatted_conversations.append(formatted_conv)
+                
+                return {
+                    "conversations": formatted_conversations,
+                    "total_found": len(conversations),
+                    "search_query": search_query
+                }
+            elif response.status_code == 404:
+                logger.info(f"No conversation history found for user {user_id}")
+                return {"conversations": [], "message": "No previous conversations found"}
+            else:
+                logger.warning(f"Memory API returned status {response.status_code} for conversation search")
+                return {"conversations": [], "message": f"Search failed with status {response.status_code}"}
+                
+    except (asyncio.TimeoutError, httpx.TimeoutException):
         logger.warning(f"Memory API timeout ({MEMORY_API_TIMEOUT}s) for conversation search")
         return {"conversations": [], "message": "Search timeout"}
     except Exception as e:
@@ -1336,38 +1866,11 @@ conversation_search_tool = {
     "type": "function",
     "function": {
         "name": "search_conversation_history",
-        "description": """Search through the user's previous conversations using semantic search. This tool finds relevant past conversations based on topics, themes, or context rather than exact keyword matching.
-
-Use this tool when:
-- User references something they discussed before
-- User asks about previous topics or conversations
-- You need context from past interactions
-- User wants to continue a previous discussion
-
-The tool returns conversation summaries with:
-- Brief summary of each conversation
-- Main themes and topics discussed
-- People and places mentioned
-- User sentiment during the conversation
-- Relevance score (how well it matches the search query)
-- Timestamp of the conversation
-
-Example response format:
-{
-  "conversations": [
-    {
-      "summary": "User discussed their vacation plans to Japan, asking about travel tips and cultural customs",
-      "themes": ["travel", "Japan", "vacation planning", "cultural advice"],
-      "timestamp": "2024-12-01T10:30:00Z",
-      "relevance_score": 0.85,
-      "user_sentiment": "excited",
-      "persons_mentioned": ["Sakura (local guide)"],
-      "places_mentioned": ["Tokyo", "Kyoto", "Mount Fuji"]
-    }
-  ],
-  "total_found": 1,
-  "search_query": "Japan travel plans"
-}""",
+        "description": """Search the user's previous conversations by topic, theme or context (semantic, not exact keywords).
+
+Use when the user references or wants to continue an earlier discussion, or when context from past interactions would help.
+
+Returns conversation summaries with themes, people and places mentioned, user sentiment, relevance score and timestamp.""",
         "parameters": {
             "type": "object",
             "properties": {
@@ -1388,14 +1891,76 @@ Example response format:
     }
 }
 
+# Shared tools list passed to every completion request, built once at import time
+CHAT_TOOLS = [conversation_search_tool]
+
+async def receive_loop(receiver_index: int, credential, work_queue: asyncio.Queue, lock_renewer: AutoLockRenewer,
+                       receiving_stopped: asyncio.Event, workers_stopped: asyncio.Event):
+    """
+    Receive user messages on a dedicated Service Bus connection and feed them to the worker pool.
+
+    Reconnects on errors until shutdown. On shutdown, abandons messages received but not yet queued,
+    sets ``receiving_stopped`` and keeps the receiver open until ``workers_stopped`` is set so that
+    in-flight messages can still be settled on it.
+    """
+    prefetch_count = max(1, SERVICEBUS_PREFETCH_COUNT // NUM_RECEIVERS)
+    try:
+        while not shutdown_event.is_set():
+            try:
+                async with ServiceBusClient(fully_qualified_namespace=SERVICEBUS_FULLY_QUALIFIED_NAMESPACE, credential=credential) as sb_client:
+                    async with sb_client.get_subscription_receiver(
+                                SERVICEBUS_USER_MESSAGES_TOPIC,
+                                SERVICEBUS_USER_MESSAGES_SUBSCRIPTION,
+                                prefetch_count=prefetch_count,
+                                auto_lock_renewer=lock_renewer,
+                            ) as receiver:
+                        logger.info(f"Receiver {receiver_index} connected and listening for messages.")
+                        pending_msgs = []
+                        
+                        # Main message processing loop; max_wait_time bounds each receive so shutdown is checked regularly
+                        while not shutdown_event.is_set():
+                            # Take up to a full worker pool's worth of messages from the prefetch buffer per call
+                            received_messages = await receiver.receive_messages(max_message_count=MAX_CONCURRENCY, max_wait_time=1)
+                            
+                            if not received_messages:
+                                continue  # No messages received, check shutdown and retry
+                            
+                            for index, msg in enumerate(received_messages):
+                                # Check for shutdown signal before processing new messages
+                                if shutdown_event.is_set():
+                                    logger.info("Shutdown signal received. Stopping message processing.")
+                                    pending_msgs.extend((receiver, m) for m in received_messages[index:])
+                                    break
+                                
+                                await work_queue.put((receiver, msg)) # Wait for queue space
+
+                        # Abandon received messages that were never queued
+                        await abandon_messages(pending_msgs, logger)
+
+                        if shutdown_event.is_set():
+                            # Keep the receiver open until in-flight messages are settled
+                            receiving_stopped.set()
+                            await workers_stopped.wait()
+            except Exception as e:
+                if shutdown_event.is_set():
+                    logger.info("Shutdown in progress, ignoring connection error.")
+                    break
+                logger.error(f"Exception in receiver {receiver_index} connection/receive loop: {e}. Retrying in 10 seconds...")
+                await asyncio.sleep(10) # Wait before retrying connection
+    finally:
+        receiving_stopped.set()
+
+
 async def main():
-    global chat_client, redis_client, blob_service_client
+    global chat_client, redis_client, blob_service_client, memory_api_session
+    global token_stream_senders, message_completed_sender
     logger.info("Starting LLM worker...")
     logger.info(f"Service Bus Namespace: {SERVICEBUS_FULLY_QUALIFIED_NAMESPACE}")
     logger.info(f"Listening for user messages on Topic: '{SERVICEBUS_USER_MESSAGES_TOPIC}', Subscription: '{SERVICEBUS_USER_MESSAGES_SUBSCRIPTION}'")
     logger.info(f"Sending token streams to Topic: '{SERVICEBUS_TOKEN_STREAMS_TOPIC}'")
     logger.info(f"Sending completion events to Topic: '{SERVICEBUS_MESSAGE_COMPLETED_TOPIC}'")
     logger.info(f"Maximum concurrency for message processing: {MAX_CONCURRENCY}")
+    logger.info(f"Service Bus prefetch count: {SERVICEBUS_PREFETCH_COUNT}")
     logger.info(f"Redis Host: {REDIS_HOST}:{REDIS_PORT}, SSL: {REDIS_SSL}")
     
     # Setup signal handlers for graceful shutdown
@@ -1422,14 +1987,31 @@ async def main():
     except Exception as e:
         logger.error(f"Failed to initialize Redis client: {e}")
         raise      # Initialize the OpenAI Azure client
+    # Serve the Azure OpenAI token from a local cache until 5 minutes before expiry;
+    # the credential refresh task keeps the underlying credential warm
+    cached_token = None
+
     async def get_azure_token():
-        token = await shared_credential.get_token("https://cognitiveservices.azure.com/.default")
-        return token.token
+        nonlocal cached_token
+        if cached_token is None or cached_token.expires_on - time.time() <= 300:
+            cached_token = await shared_credential.get_token("https://cognitiveservices.azure.com/.default")
+        return cached_token.token
     
+    # HTTP/2 lets concurrent streaming completions multiplex over shared TLS connections
+    chat_http_client = DefaultAsyncHttpxClient(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=MAX_CONCURRENCY * 4,
+            max_keepalive_connections=MAX_CONCURRENCY * 2,
+            keepalive_expiry=75,
+        ),
+    )
+
     chat_client = AsyncAzureOpenAI(
         azure_endpoint=AZURE_OPENAI_ENDPOINT,
         azure_ad_token_provider=get_azure_token,
-        api_version=AZURE_OPENAI_API_VERSION
+        api_version=AZURE_OPENAI_API_VERSION,
+        http_client=chat_http_client,
     )
 
     if STORAGE_ACCOUNT_URL:
@@ -1440,63 +2022,80 @@ async def main():
         logger.info("Blob Storage client initialized successfully")
     else:
         logger.warning("STORAGE_ACCOUNT_URL not configured. Artifact generation will be disabled.")
+
+    # Keep-alive HTTP/2 client for Memory API calls so concurrent memory fetches and tool invocations
+    # multiplex over shared TCP/TLS connections
+    memory_api_session = httpx.AsyncClient(
+        http2=True,
+        timeout=MEMORY_API_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=MAX_CONCURRENCY * 2,
+            max_keepalive_connections=MAX_CONCURRENCY,
+            keepalive_expiry=60,
+        ),
+    )
     
     credential = DefaultAzureCredential()
-    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
-    active_tasks = set()
+    # Redis tokens are refreshed in the background by the redis-entraid credential provider
+    credential_refresh_task = asyncio.create_task(keep_credentials_warm([
+        (shared_credential, "https://cognitiveservices.azure.com/.default"),
+        (credential, "https://servicebus.azure.net/.default"),
+    ]))
+    # Fixed pool of consumers fed by a bounded queue; a full queue back-pressures the receive loops
+    work_queue: asyncio.Queue = asyncio.Queue(maxsize=MAX_CONCURRENCY * 2)
+    workers = [asyncio.create_task(_worker(work_queue)) for _ in range(MAX_CONCURRENCY)]
+    # Keeps locks alive for received messages while they wait in the work queue and while they are processed
+    lock_renewer = AutoLockRenewer(max_lock_renewal_duration=MAX_LOCK_RENEWAL_DURATION)
+    receiving_stopped = [asyncio.Event() for _ in range(NUM_RECEIVERS)]
+    workers_stopped = asyncio.Event()
+    receive_tasks = set()
     
     try:
-        while not shutdown_event.is_set():
-            try:
-                async with ServiceBusClient(fully_qualified_namespace=SERVICEBUS_FULLY_QUALIFIED_NAMESPACE, credential=credential) as sb_client:
-                    async with sb_client.get_subscription_receiver(SERVICEBUS_USER_MESSAGES_TOPIC, SERVICEBUS_USER_MESSAGES_SUBSCRIPTION) as receiver:
-                        logger.info("LLM Worker connected and listening for messages.")
-                        
-                        # Main message processing loop with timeout to allow periodic shutdown checks
-                        while not shutdown_event.is_set():
-                            try:
-                                # Receive messages with a timeout to allow shutdown checks
-                                received_messages = await asyncio.wait_for(
-                                    receiver.receive_messages(max_message_count=1, max_wait_time=5),
-                                    timeout=10
-                                )
-                                
-                                if not received_messages:
-                                    continue  # No messages received, check shutdown and retry
-                                
-                                for msg in received_messages:
-                                    # Check for shutdown signal before processing new messages
-                                    if shutdown_event.is_set():
-                                        logger.info("Shutdown signal received. Stopping message processing.")
-                                        # Abandon the current message so it can be processed by another worker
-                                        await receiver.abandon_message(msg)
-                                        break
-                                    
-                                    await semaphore.acquire() # Wait for an available slot
-                                    task = asyncio.create_task(
-                                        _process_and_handle_message(sb_client, msg, receiver, semaphore, logger)
-                                    )
-                                    active_tasks.add(task)
-                                    # Remove task from set upon completion to prevent memory leak over long runs
-                                    task.add_done_callback(active_tasks.discard)
-                            except asyncio.TimeoutError:
-                                # Timeout is expected, continue to check shutdown event
-                                continue
-            except Exception as e:
-                if shutdown_event.is_set():
-                    logger.info("Shutdown in progress, ignoring connection error.")
-                    break
-                logger.error(f"Exception in LLM worker main connection/receive loop: {e}. Retrying in 10 seconds...")
-                # Clean up any completed tasks
-                active_tasks = {task for task in active_tasks if not task.done()}
-                await asyncio.sleep(10) # Wait before retrying connection    except KeyboardInterrupt:
+        # Senders live on their own connection shared by all receivers and workers
+        async with ServiceBusClient(fully_qualified_namespace=SERVICEBUS_FULLY_QUALIFIED_NAMESPACE, credential=credential) as sender_client, \
+                AsyncExitStack() as sender_stack, \
+                sender_client.get_topic_sender(SERVICEBUS_MESSAGE_COMPLETED_TOPIC) as message_completed_sender:
+            token_stream_senders = asyncio.Queue()
+            for _ in range(TOKEN_STREAM_SENDERS):
+                token_stream_senders.put_nowait(await sender_stack.enter_async_context(
+                    sender_client.get_topic_sender(SERVICEBUS_TOKEN_STREAMS_TOPIC)
+                ))
+            receive_tasks = {
+                asyncio.create_task(receive_loop(i, credential, work_queue, lock_renewer, receiving_stopped[i], workers_stopped))
+                for i in range(NUM_RECEIVERS)
+            }
+            logger.info(f"LLM Worker connected and listening for messages on {NUM_RECEIVERS} receivers.")
+
+            await shutdown_event.wait()
+            await asyncio.gather(*(event.wait() for event in receiving_stopped))
+
+            # Abandon queued messages that have not started processing while their receivers are still open
+            await abandon_messages(_drain_work_queue(work_queue), logger)
+
+            # Finish in-flight messages while the receivers and senders are still open
+            await stop_workers(work_queue, workers, timeout=240)
+            workers_stopped.set()
+            await wait_for_tasks_completion(receive_tasks, timeout=30)
+    except KeyboardInterrupt:
         logger.info("Keyboard interrupt received. Initiating graceful shutdown...")
         shutdown_event.set()
     
     finally:
         logger.info("Shutting down gracefully...")
-        # Wait for all active tasks to complete with a 4-minute timeout
-        await wait_for_tasks_completion(active_tasks, timeout=240)
+        shutdown_event.set()
+        # Stop workers once in-flight messages finish, waiting with a 4-minute timeout
+        await stop_workers(work_queue, workers, timeout=240)
+        workers_stopped.set()
+        if receive_tasks:
+            await wait_for_tasks_completion(receive_tasks, timeout=30)
+
+        try:
+            await lock_renewer.close()
+        except Exception as e:
+            logger.warning(f"Error closing lock renewer: {e}")
+
+        credential_refresh_task.cancel()
+        await asyncio.gather(credential_refresh_task, return_exceptions=True)
         
         # Close the chat client to clean up aiohttp session
         if chat_client:
@@ -1520,8 +2119,19 @@ async def main():
                 logger.info("Blob Storage client closed successfully")
             except Exception as e:
                 logger.warning(f"Error closing Blob Storage client: {e}")
+
+        if memory_api_session:
+            try:
+                await memory_api_session.aclose()
+                logger.info("Memory API session closed successfully")
+            except Exception as e:
+                logger.warning(f"Error closing Memory API session: {e}")
         
         logger.info("LLM worker shutdown complete.")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if sys.platform != 'win32':
+        import uvloop
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
@@ -1,18 +1,27 @@
 import os
-import json
+import asyncio
+import hashlib
 import logging
+import time
 import numpy as np
+import orjson
+import redis.asyncio as redis
 import uvicorn
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from typing import List, Optional, Dict, Any
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
-from azure.cosmos import CosmosClient, PartitionKey, exceptions
+from azure.identity.aio import DefaultAzureCredential, get_bearer_token_provider
+from azure.cosmos import PartitionKey, exceptions
+from azure.cosmos.aio import CosmosClient
 from azure.monitor.opentelemetry import configure_azure_monitor
 from openai import AsyncAzureOpenAI
+from redis_entraid.cred_provider import create_from_default_azure_credential
 from opentelemetry import trace
 from opentelemetry.instrumentation.openai_v2 import OpenAIInstrumentor
 
@@ -29,6 +38,24 @@ COSMOS_USER_MEMORIES_CONTAINER_NAME = os.getenv("COSMOS_USER_MEMORIES_CONTAINER_
 AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
 AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT_NAME")
 AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2025-04-01-preview")
+# Concurrent embedding requests are coalesced into one call of up to this many inputs
+EMBEDDING_BATCH_MAX = int(os.getenv("EMBEDDING_BATCH_MAX", "16"))
+EMBEDDING_BATCH_MS = float(os.getenv("EMBEDDING_BATCH_MS", "5"))
+# Recent query embeddings kept in process (0 disables the cache)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+# Users with at most this many embedded conversations are ranked in process from vectors
+# fetched while the query embedding is generated; larger histories use the Cosmos vector index.
+# Opt-in (0 = disabled): every prefetch downloads and parses full embeddings on the event loop.
+SEARCH_PREFETCH_MAX_CANDIDATES = int(os.getenv("SEARCH_PREFETCH_MAX_CANDIDATES", "0"))
+# How long a user found above that threshold skips the prefetch and goes straight to Cosmos
+SEARCH_PREFETCH_SKIP_TTL_SECONDS = int(os.getenv("SEARCH_PREFETCH_SKIP_TTL_SECONDS", "3600"))
+SEARCH_PREFETCH_SKIP_CACHE_SIZE = 10000
+
+# Optional Redis cache of query embeddings shared by all replicas (disabled without REDIS_HOST)
+REDIS_HOST = os.getenv("REDIS_HOST")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6380"))
+REDIS_SSL = os.getenv("REDIS_SSL", "true").lower() == "true"
+EMBEDDING_REDIS_TTL_SECONDS = int(os.getenv("EMBEDDING_REDIS_TTL_SECONDS", str(24 * 60 * 60)))
 
 if not COSMOS_ENDPOINT:
     raise RuntimeError("Missing required environment variable COSMOS_ENDPOINT")
@@ -47,7 +74,8 @@ logger.setLevel(LOG_LEVEL)
 configure_azure_monitor(
     enable_live_metrics=True,
     instrumentation_options={
-        "azure_sdk": {"enabled": True},
+        # Request-level FastAPI spans only; per-call Cosmos SDK spans are too costly at high QPS
+        "azure_sdk": {"enabled": False},
         "django": {"enabled": False},
         "fastapi": {"enabled": True},
         "flask": {"enabled": False},
@@ -84,11 +112,38 @@ openai_client = AsyncAzureOpenAI(
     api_version=AZURE_OPENAI_API_VERSION,
 )
 
+redis_client: redis.Redis | None = None
+if REDIS_HOST:
+    redis_client = redis.Redis(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        ssl=REDIS_SSL,
+        ssl_cert_reqs=None,  # For Azure Managed Redis, SSL cert validation can be relaxed
+        credential_provider=create_from_default_azure_credential(
+            ("https://redis.azure.com/.default",)
+        ),
+        health_check_interval=30,
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        yield  # Application runs
+    finally:
+        logger.info("Application shutdown: Closing Cosmos DB, Azure OpenAI and Redis clients.")
+        await cosmos_client.close()
+        await openai_client.close()
+        if redis_client:
+            await redis_client.aclose()
+        await credential.close()
+
 # FastAPI app
 app = FastAPI(
     title="Scalable Chat Memory API",
     version="0.1.0",
     description="API for managing conversation memories and user profiles in Cosmos DB",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS
@@ -165,10 +220,151 @@ class McpRequest(BaseModel):
     method: str
     params: Dict[str, Any] = {}
 
+# Cosmos DB queries
+# Prefetch of a user's embedded conversations for in-process ranking
+PREFETCH_VECTORS_QUERY = """
+    SELECT TOP @top c.sessionId, c.summary, c.timestamp, c.themes, c.persons,
+           c.places, c.user_sentiment, c.vector_embedding
+    FROM c
+    WHERE c.userId = @userId AND IS_ARRAY(c.vector_embedding) AND ARRAY_LENGTH(c.vector_embedding) > 0
+"""
+# Server-side vector similarity search, used when the query has an embedding
+VECTOR_SEARCH_QUERY = """
+    SELECT c.sessionId, c.summary, c.timestamp, c.themes, c.persons,
+           c.places, c.user_sentiment,
+           VectorDistance(c.vector_embedding, @queryVector) AS distance
+    FROM c
+    WHERE c.userId = @userId AND IS_ARRAY(c.vector_embedding) AND ARRAY_LENGTH(c.vector_embedding) > 0
+    ORDER BY VectorDistance(c.vector_embedding, @queryVector)
+    OFFSET 0 LIMIT @limit
+"""
+# Fallback text-based search, used when no query embedding is available
+# (documents written before summary_lower existed are still lowercased in the query)
+TEXT_SEARCH_QUERY = """
+    SELECT c.sessionId, c.summary, c.summary_lower, c.timestamp, c.themes, c.persons,
+           c.places, c.user_sentiment
+    FROM c
+    WHERE c.userId = @userId AND (
+        CONTAINS(c.summary_lower, @searchTextLower) OR
+        (NOT IS_DEFINED(c.summary_lower) AND CONTAINS(LOWER(c.summary), @searchTextLower)) OR
+        ARRAY_CONTAINS(c.themes, @searchText, true) OR
+        ARRAY_CONTAINS(c.persons, @searchText, true) OR
+        ARRAY_CONTAINS(c.places, @searchText, true)
+    )
+    ORDER BY c.timestamp DESC
+    OFFSET 0 LIMIT @limit
+"""
+
 # Helper functions
+class EmbeddingBatcher:
+    """Coalesce concurrent embedding requests into a single embeddings call."""
+
+    def __init__(self, max_batch: int, linger_seconds: float):
+        self.max_batch = max(1, max_batch)
+        self.linger_seconds = max(0.0, linger_seconds)
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.collector: Optional[asyncio.Task] = None
+        self.inflight: set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> List[float]:
+        """Queue text for the next batch and wait for its embedding."""
+        if self.collector is None or self.collector.done():
+            self.collector = asyncio.create_task(self._collect())
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((text, future))
+        return await future
+
+    async def _collect(self) -> None:
+        """Group queued requests by size or linger time and dispatch each group."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.linger_seconds
+            while len(batch) < self.max_batch:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except TimeoutError:
+                    break
+
+            # Dispatch without waiting so the next batch can fill up meanwhile
+            task = asyncio.create_task(self._embed_batch(batch))
+            self.inflight.add(task)
+            task.add_done_callback(self.inflight.discard)
+
+    async def _embed_batch(self, batch: List[tuple[str, asyncio.Future]]) -> None:
+        """Embed one batch and resolve the waiting callers."""
+        try:
+            response = await openai_client.embeddings.create(
+                input=[text for text, _ in batch],
+                model=AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT_NAME
+            )
+        except Exception as e:
+            if len(batch) > 1:
+                # One invalid input rejects the whole request; retry each member alone so
+                # only the offending caller fails
+                logger.warning(f"Embedding batch of {len(batch)} failed, retrying individually: {e}")
+                await asyncio.gather(*(self._embed_batch([entry]) for entry in batch))
+                return
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for item in response.data:
+            future = batch[item.index][1]
+            if not future.done():
+                future.set_result(item.embedding)
+
+embedding_batcher = EmbeddingBatcher(EMBEDDING_BATCH_MAX, EMBEDDING_BATCH_MS / 1000)
+# LRU of normalized query text -> float32 embedding
+embedding_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+# LRU of user id -> monotonic time until which searches skip the vector prefetch
+prefetch_skip_until: "OrderedDict[str, float]" = OrderedDict()
+
+def shared_embedding_key(text: str) -> str:
+    """Redis key for a query embedding, scoped to the embeddings deployment."""
+    digest = hashlib.sha1(f"{AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT_NAME}\n{text}".encode()).hexdigest()
+    return f"emb:{digest}"
+
+async def read_shared_embedding(text: str) -> Optional[np.ndarray]:
+    """Return a query embedding from the shared Redis cache, or None on a miss."""
+    if redis_client is None:
+        return None
+    try:
+        cached = await redis_client.get(shared_embedding_key(text))
+    except Exception as e:
+        logger.warning(f"Failed to read shared embedding cache: {e}")
+        return None
+    if cached is None:
+        return None
+    return np.frombuffer(cached, dtype=np.float16).astype(np.float32)
+
+async def write_shared_embedding(text: str, vector: np.ndarray) -> None:
+    """Store a query embedding in the shared Redis cache as float16 bytes."""
+    if redis_client is None:
+        return
+    try:
+        await redis_client.setex(
+            shared_embedding_key(text),
+            EMBEDDING_REDIS_TTL_SECONDS,
+            vector.astype(np.float16).tobytes(),
+        )
+    except Exception as e:
+        logger.warning(f"Failed to write shared embedding cache: {e}")
+
 async def generate_embedding(text: str) -> List[float]:
     """
-    Generate text embedding using Azure OpenAI.
+    Generate a unit-length text embedding using Azure OpenAI.
+
+    Repeated queries are served from an in-process LRU cache, then from the
+    shared Redis cache, and concurrent misses are batched into one
+    embeddings request.
     
     Args:
         text: The text to generate embeddings for
@@ -179,31 +375,132 @@ async def generate_embedding(text: str) -> List[float]:
     Raises:
         Exception: If embedding generation fails
     """
+    key = " ".join(text.split())
+    if not key:
+        # The embeddings API rejects empty input; callers fall back to text search
+        return []
+    cached = embedding_cache.get(key)
+    if cached is not None:
+        embedding_cache.move_to_end(key)
+        return cached.tolist()
+
+    vector = await read_shared_embedding(key)
+    if vector is None:
+        try:
+            embedding = await embedding_batcher.embed(key)
+        except Exception as e:
+            logger.error(f"Failed to generate embedding: {e}")
+            return []
+
+        # Unit-length queries let similarity against stored (normalized) vectors be a plain dot product
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        await write_shared_embedding(key, vector)
+
+    if EMBEDDING_CACHE_SIZE > 0:
+        embedding_cache[key] = vector
+        if len(embedding_cache) > EMBEDDING_CACHE_SIZE:
+            embedding_cache.popitem(last=False)
+    return vector.tolist()
+
+async def prefetch_user_vectors(user_id: str, max_candidates: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Fetch a user's embedded conversations for in-process ranking.
+
+    Returns None when ranking should be left to Cosmos because the feature is
+    disabled, the prefetch failed or the user has more than max_candidates
+    embedded conversations. Users over the limit are remembered for
+    SEARCH_PREFETCH_SKIP_TTL_SECONDS so their vectors are not fetched just to be
+    discarded on every search.
+    """
+    if max_candidates <= 0:
+        return None
+
+    skip_until = prefetch_skip_until.get(user_id)
+    if skip_until is not None:
+        if skip_until > time.monotonic():
+            return None
+        del prefetch_skip_until[user_id]
+
     try:
-        response = await openai_client.embeddings.create(
-            input=[text],
-            model=AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT_NAME
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        logger.error(f"Failed to generate embedding: {e}")
+        items = [item async for item in conversations_container.query_items(
+            query=PREFETCH_VECTORS_QUERY,
+            parameters=[
+                {"name": "@userId", "value": user_id},
+                {"name": "@top", "value": max_candidates + 1}
+            ],
+            partition_key=user_id
+        )]
+    except exceptions.CosmosHttpResponseError as e:
+        logger.warning(f"Failed to prefetch vectors for {user_id}, using Cosmos vector search: {e}")
+        return None
+
+    if len(items) > max_candidates:
+        prefetch_skip_until[user_id] = time.monotonic() + SEARCH_PREFETCH_SKIP_TTL_SECONDS
+        if len(prefetch_skip_until) > SEARCH_PREFETCH_SKIP_CACHE_SIZE:
+            prefetch_skip_until.popitem(last=False)
+        return None
+    return items
+
+def rank_by_similarity(query_embedding: List[float], candidates: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """Order prefetched conversations like Cosmos VectorDistance does and keep the top results."""
+    if not candidates:
         return []
 
-def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
-    """Calculate cosine similarity between two vectors."""
-    if not vec1 or not vec2 or len(vec1) != len(vec2):
-        return 0.0
-    
-    vec1_np = np.array(vec1)
-    vec2_np = np.array(vec2)
-    
-    norm1 = np.linalg.norm(vec1_np)
-    norm2 = np.linalg.norm(vec2_np)
-    
-    if norm1 == 0 or norm2 == 0:
-        return 0.0
-    
-    return float(np.dot(vec1_np, vec2_np) / (norm1 * norm2))
+    # Score every candidate with one matrix-vector product. Both sides are unit length,
+    # so the dot product equals the cosine similarity VectorDistance reports.
+    # Rows whose embedding does not match the query dimension (e.g. from another model) are skipped
+    query_vector = np.asarray(query_embedding, dtype=np.float32)
+    candidates = [item for item in candidates if len(item["vector_embedding"]) == len(query_vector)]
+    if not candidates:
+        return []
+    matrix = np.array([item["vector_embedding"] for item in candidates], dtype=np.float32)
+    scores = matrix @ query_vector
+
+    ranked = []
+    for index in np.argsort(-scores, kind="stable")[:limit]:
+        item = candidates[index]
+        item["distance"] = float(scores[index])
+        ranked.append(item)
+    return ranked
+
+def build_search_result(item: Dict[str, Any], vector_search: bool, query_text: str) -> MemorySearchResult:
+    """
+    Convert a Cosmos conversation row into a scored search result.
+
+    Args:
+        item: Conversation row from a search query
+        vector_search: Whether the row carries a VectorDistance score
+        query_text: Lowercased search query, used for text-based scoring
+
+    Returns:
+        MemorySearchResult: Search result with relevance score
+    """
+    if vector_search:
+        # The query only returns rows with a non-empty embedding (failed embeddings are stored as [])
+        # Convert distance to similarity score (1 - normalized distance)
+        distance = item.get("distance", 1.0)
+        relevance_score = max(0.0, 1.0 - distance)
+    elif query_text in (item.get("summary_lower") or item["summary"].lower()):
+        # Text-based relevance scoring
+        relevance_score = 0.8
+    else:
+        relevance_score = 0.5
+
+    # Rows come from our own container and the endpoint's response_model still
+    # validates the outgoing payload, so skip per-row validation here
+    return MemorySearchResult.model_construct(
+        sessionId=item["sessionId"],
+        summary=item["summary"],
+        timestamp=datetime.fromisoformat(item["timestamp"]),
+        themes=item.get("themes", []),
+        persons=item.get("persons", []),
+        places=item.get("places", []),
+        user_sentiment=item.get("user_sentiment", "neutral"),
+        relevance_score=relevance_score
+    )
 
 def validate_mcp_request_security(request: Request) -> None:
     """Validate MCP origin and optional auth requirements."""
@@ -321,7 +618,7 @@ async def mcp_endpoint(rpc: McpRequest, request: Request):
         if not uri.startswith(prefix):
             return mcp_error(rpc.id, -32602, "Unsupported memory resource URI")
         payload = await get_user_memory_payload(uri.removeprefix(prefix))
-        return mcp_result(rpc.id, {"contents": [{"uri": uri, "mimeType": "application/json", "text": json.dumps(payload)}]})
+        return mcp_result(rpc.id, {"contents": [{"uri": uri, "mimeType": "application/json", "text": orjson.dumps(payload).decode()}]})
 
     return mcp_error(rpc.id, -32601, f"Unsupported MCP method: {rpc.method}")
 
@@ -347,60 +644,36 @@ async def get_user_memories(user_id: str):
             current_span.set_attribute("app.operation", "get_user_memories")
         
         try:
-            # Query user memories
-            query = "SELECT * FROM c WHERE c.userId = @userId"
-            items = list(user_memories_container.query_items(
-                query=query,
-                parameters=[{"name": "@userId", "value": user_id}],
-                enable_cross_partition_query=True
-            ))
-            
-            if not items:
-                # Add result information to span
-                if current_span.is_recording():
-                    current_span.set_attribute("app.memories_found", False)
-                # Return empty user memory structure
-                return UserMemory(
-                    userId=user_id,
-                    last_updated=datetime.now(timezone.utc)
-                )
-            
+            # User memory documents use the user ID as both id and partition key
+            memory_data = await user_memories_container.read_item(item=user_id, partition_key=user_id)
+        except exceptions.CosmosResourceNotFoundError:
             # Add result information to span
             if current_span.is_recording():
-                current_span.set_attribute("app.memories_found", True)
-            
-            memory_data = items[0]
-            return UserMemory(**memory_data)
-            
+                current_span.set_attribute("app.memories_found", False)
+            # Return empty user memory structure
+            return UserMemory(
+                userId=user_id,
+                last_updated=datetime.now(timezone.utc)
+            )
         except exceptions.CosmosHttpResponseError as e:
             if current_span.is_recording():
                 current_span.set_attribute("app.error", "cosmos_error")
             logger.error(f"Error retrieving user memories for {user_id}: {e}")
             raise HTTPException(status_code=500, detail="Failed to retrieve user memories")
 
+        # Add result information to span
+        if current_span.is_recording():
+            current_span.set_attribute("app.memories_found", True)
+
+        return UserMemory(**memory_data)
+
 @app.delete("/api/memory/users/{user_id}/memories")
 async def delete_user_memories(user_id: str):
     """Delete all structured memories for a specific user."""
     with tracer.start_as_current_span("delete_user_memories"):
         try:
-            # Query for existing user memories
-            query = "SELECT * FROM c WHERE c.userId = @userId"
-            items = list(user_memories_container.query_items(
-                query=query,
-                parameters=[{"name": "@userId", "value": user_id}],
-                enable_cross_partition_query=True
-            ))
-            
-            if not items:
-                # No memories found for this user
-                raise HTTPException(status_code=404, detail="No user memories found")
-            
-            # Delete the user memory document
-            memory_doc = items[0]
-            user_memories_container.delete_item(
-                item=memory_doc["id"],
-                partition_key=memory_doc["userId"]
-            )
+            # User memory documents use the user ID as both id and partition key
+            await user_memories_container.delete_item(item=user_id, partition_key=user_id)
             
             logger.info(f"Deleted user memories for user {user_id}")
             return {"status": "success", "message": f"User memories deleted for user {user_id}"}
@@ -436,92 +709,52 @@ async def search_conversation_memories(user_id: str, search_request: MemorySearc
             current_span.set_attribute("app.search_limit", search_request.limit)
         
         try:
-            # Generate embedding for the search query
-            query_embedding = await generate_embedding(search_request.query)
+            # Generate embedding for the search query while fetching the user's vectors
+            query_embedding, candidates = await asyncio.gather(
+                generate_embedding(search_request.query),
+                prefetch_user_vectors(user_id, SEARCH_PREFETCH_MAX_CANDIDATES),
+            )
+            query_text = search_request.query.lower()
             
-            if query_embedding:
+            if query_embedding and candidates is not None:
+                # Add embedding information to span
+                if current_span.is_recording():
+                    current_span.set_attribute("app.search_method", "prefetched_vector_similarity")
+
+                results = [
+                    build_search_result(item, True, query_text)
+                    for item in rank_by_similarity(query_embedding, candidates, search_request.limit)
+                ]
+            elif query_embedding:
                 # Add embedding information to span
                 if current_span.is_recording():
                     current_span.set_attribute("app.search_method", "vector_similarity")
                     
-                # Use CosmosDB vector similarity search if embeddings are available
-                query = """
-                    SELECT c.sessionId, c.summary, c.timestamp, c.themes, c.persons, 
-                           c.places, c.user_sentiment, c.vector_embedding,
-                           VectorDistance(c.vector_embedding, @queryVector) AS distance
-                    FROM c 
-                    WHERE c.userId = @userId AND c.vector_embedding != null
-                    ORDER BY VectorDistance(c.vector_embedding, @queryVector)
-                    OFFSET 0 LIMIT @limit
-                """
-                
-                items = list(conversations_container.query_items(
-                    query=query,
+                # Build results page by page as Cosmos returns them
+                results = [build_search_result(item, True, query_text) async for item in conversations_container.query_items(
+                    query=VECTOR_SEARCH_QUERY,
                     parameters=[
                         {"name": "@userId", "value": user_id},
                         {"name": "@queryVector", "value": query_embedding},
                         {"name": "@limit", "value": search_request.limit}
                     ],
-                    enable_cross_partition_query=True
-                ))
+                    partition_key=user_id
+                )]
             else:
                 # Add fallback information to span
                 if current_span.is_recording():
                     current_span.set_attribute("app.search_method", "text_based")
                     
-                # Fallback to text-based search
-                query = """
-                    SELECT c.sessionId, c.summary, c.timestamp, c.themes, c.persons, 
-                           c.places, c.user_sentiment, c.vector_embedding
-                    FROM c 
-                    WHERE c.userId = @userId AND (
-                        CONTAINS(LOWER(c.summary), LOWER(@searchText)) OR
-                        ARRAY_CONTAINS(c.themes, @searchText, true) OR
-                        ARRAY_CONTAINS(c.persons, @searchText, true) OR
-                        ARRAY_CONTAINS(c.places, @searchText, true)
-                    )
-                    ORDER BY c.timestamp DESC
-                    OFFSET 0 LIMIT @limit
-                """
-                
-                items = list(conversations_container.query_items(
-                    query=query,
+                results = [build_search_result(item, False, query_text) async for item in conversations_container.query_items(
+                    query=TEXT_SEARCH_QUERY,
                     parameters=[
                         {"name": "@userId", "value": user_id},
                         {"name": "@searchText", "value": search_request.query},
+                        {"name": "@searchTextLower", "value": query_text},
                         {"name": "@limit", "value": search_request.limit}
                     ],
-                    enable_cross_partition_query=True
-                ))
-            
-            results = []
-            for item in items:
-                # Calculate relevance score
-                relevance_score = 1.0
-                if query_embedding and item.get("vector_embedding"):
-                    # Convert distance to similarity score (1 - normalized distance)
-                    distance = item.get("distance", 1.0)
-                    relevance_score = max(0.0, 1.0 - distance)
-                elif not query_embedding:
-                    # Text-based relevance scoring
-                    summary_text = item["summary"].lower()
-                    query_text = search_request.query.lower()
-                    if query_text in summary_text:
-                        relevance_score = 0.8
-                    else:
-                        relevance_score = 0.5
-                
-                result = MemorySearchResult(
-                    sessionId=item["sessionId"],
-                    summary=item["summary"],
-                    timestamp=datetime.fromisoformat(item["timestamp"].replace("Z", "+00:00")),
-                    themes=item.get("themes", []),
-                    persons=item.get("persons", []),
-                    places=item.get("places", []),
-                    user_sentiment=item.get("user_sentiment", "neutral"),
-                    relevance_score=relevance_score
-                )
-                results.append(result)
+                    partition_key=user_id
+                )]
             
             return results
             
@@ -22,9 +22,10 @@ Usage:
 """
 
 import os
-import json
+import orjson
 import asyncio
 import logging
+import math
 import signal
 import sys
 from contextvars import ContextVar
@@ -32,28 +33,23 @@ from datetime import datetime, timezone
 from typing import List, Literal
 from dotenv import load_dotenv
 from azure.identity.aio import DefaultAzureCredential
-from azure.servicebus.aio import ServiceBusClient
+from azure.servicebus.aio import AutoLockRenewer, ServiceBusClient
 from azure.servicebus import ServiceBusMessage
 from azure.monitor.opentelemetry import configure_azure_monitor
 from opentelemetry import trace
 from opentelemetry.sdk.trace.export import SpanProcessor
 from opentelemetry.instrumentation.openai_v2 import OpenAIInstrumentor
-from openai import AsyncAzureOpenAI
+from openai import AsyncAzureOpenAI, DefaultAsyncHttpxClient
+import httpx
 import redis.asyncio as redis
 from redis_entraid.cred_provider import create_from_default_azure_credential
 from azure.cosmos.aio import CosmosClient
-from azure.cosmos import PartitionKey
+from azure.cosmos import PartitionKey, exceptions
 from pydantic import BaseModel, Field, ConfigDict
 
 # Load .env in development
 load_dotenv()
 
-# Enable OpenTelemetry instrumentation for OpenAI SDK
-OpenAIInstrumentor().instrument()
-
-# Set environment variable to capture message content
-os.environ.setdefault("OTEL_INSTRUMENTATION_GENAI_CAPTURE_MESSAGE_CONTENT", "true")
-
 # Context variables for storing application-specific information across spans
 current_user_id: ContextVar[str] = ContextVar('current_user_id', default=None)
 current_session_id: ContextVar[str] = ContextVar('current_session_id', default=None)
@@ -102,28 +98,21 @@ class AppAttributesSpanProcessor(SpanProcessor):
             span: The span that was started
             parent_context: The parent context of the span
         """
-        try:
-            # Add user_id if available in context
-            user_id = current_user_id.get()
-            if user_id:
-                span.set_attribute("app.user_id", user_id)
-            
-            # Add session_id if available in context
-            session_id = current_session_id.get()
-            if session_id:
-                span.set_attribute("app.session_id", session_id)
-            
-            # Add message_id if available in context
-            message_id = current_message_id.get()
-            if message_id:
-                span.set_attribute("app.chat_message_id", message_id)
-                
-            # Add application name for easier filtering
-            span.set_attribute("app.name", "memory-worker")
-            
-        except Exception as e:
-            # Don't fail span creation if attribute setting fails
-            logger.warning(f"Failed to add application attributes to span: {e}")
+        if not span.is_recording():
+            return
+        
+        # Collect everything first so the span is updated with a single set_attributes call
+        attributes = {"app.name": "memory-worker"}
+        user_id = current_user_id.get()
+        if user_id:
+            attributes["app.user_id"] = user_id
+        session_id = current_session_id.get()
+        if session_id:
+            attributes["app.session_id"] = session_id
+        message_id = current_message_id.get()
+        if message_id:
+            attributes["app.chat_message_id"] = message_id
+        span.set_attributes(attributes)
     
     def on_end(self, span):
         """Called when a span is ended. No action needed for our use case."""
@@ -162,12 +151,70 @@ class UserMemoryUpdates(BaseModel):
     work_profile: List[str] = Field(description="Array of strings of professional information user shares")
     goals: List[str] = Field(description="Array of strings of user's stated objectives or aspirations")
 
+# Memory profile fields, in schema order; system fields like id, userId and timestamp are kept out
+USER_MEMORY_FIELDS = tuple(UserMemoryUpdates.model_fields)
+
+# Structured output formats and constant prompts, built once at import instead of per LLM call
+CONVERSATION_SUMMARY_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "ConversationAnalysis", 
+        "schema": ConversationSummary.model_json_schema(),
+        "description": "Structured analysis of a conversation including summary, themes, persons, places, and user sentiment",
+        "strict": True
+    }
+}
+
+USER_MEMORY_UPDATES_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "UserMemoryUpdates",
+        "schema": UserMemoryUpdates.model_json_schema(),
+        "description": "Updates to user memory based on conversation analysis",
+        "strict": True
+    }
+}
+
+CONVERSATION_SUMMARY_SYSTEM_PROMPT = """
+You are a conversation analyzer. Analyze the following conversation and extract key information.
+
+Focus on:
+- Creating a concise paragraph summary of the conversation
+- Identifying key topics/themes discussed (maximum 5)
+- Finding people mentioned by name (excluding the user and assistant)
+- Locating specific places or locations mentioned
+- Determining the overall user sentiment
+
+Focus on factual information and avoid speculation. 
+It is OK to return empty field if not applicable. 
+Return structured data following the specified schema.
+"""
+
 # Service Bus configuration
 SERVICEBUS_FULLY_QUALIFIED_NAMESPACE = os.getenv("SERVICEBUS_FULLY_QUALIFIED_NAMESPACE")
 SERVICEBUS_MESSAGE_COMPLETED_TOPIC = os.getenv("SERVICEBUS_MESSAGE_COMPLETED_TOPIC")
 SERVICEBUS_MESSAGE_COMPLETED_SUBSCRIPTION = os.getenv("SERVICEBUS_MESSAGE_COMPLETED_SUBSCRIPTION")
 MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", 10))
 
+# LLM input limits: only the most recent messages are analyzed and each is capped in length.
+# Assistant replies are context only for memory extraction, so they get a much shorter cap there.
+CONVERSATION_MAX_MESSAGES = int(os.getenv("CONVERSATION_MAX_MESSAGES", 20))
+CONVERSATION_MAX_MESSAGE_CHARS = int(os.getenv("CONVERSATION_MAX_MESSAGE_CHARS", 2000))
+MEMORY_ASSISTANT_CONTEXT_CHARS = int(os.getenv("MEMORY_ASSISTANT_CONTEXT_CHARS", 300))
+
+# Cap on in-flight Azure OpenAI calls across all messages, independent of MAX_CONCURRENCY
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 32))
+
+# How long a processed chatMessageId is remembered so redeliveries skip the LLM and Cosmos work.
+# While processing, the claim only lives for about one Service Bus lock duration, so a crashed
+# worker cannot keep the redelivered message marked as done.
+PROCESSED_MESSAGE_TTL_SECONDS = int(os.getenv("PROCESSED_MESSAGE_TTL_SECONDS", 3600))
+PROCESSED_MESSAGE_CLAIM_TTL_SECONDS = int(os.getenv("PROCESSED_MESSAGE_CLAIM_TTL_SECONDS", 60))
+# Prefetched messages are locked but not yet lock-renewed; they wait roughly
+# prefetch * per-message latency / MAX_CONCURRENCY, which must stay under the lock duration
+SERVICEBUS_PREFETCH_COUNT = int(os.getenv("SERVICEBUS_PREFETCH_COUNT", MAX_CONCURRENCY))
+MAX_LOCK_RENEWAL_DURATION = int(os.getenv("MAX_LOCK_RENEWAL_DURATION", 300))
+
 if not SERVICEBUS_FULLY_QUALIFIED_NAMESPACE or not SERVICEBUS_MESSAGE_COMPLETED_TOPIC or not SERVICEBUS_MESSAGE_COMPLETED_SUBSCRIPTION:
     raise RuntimeError("Missing Service Bus configuration in environment variables")
 
@@ -199,6 +246,7 @@ COSMOS_ENDPOINT = os.getenv("COSMOS_ENDPOINT")
 COSMOS_DATABASE_NAME = os.getenv("COSMOS_DATABASE_NAME", "memory_db")
 COSMOS_CONTAINER_NAME_CONVERSATIONS = os.getenv("COSMOS_CONTAINER_NAME_CONVERSATIONS", "conversations")
 COSMOS_CONTAINER_NAME_USER_MEMORIES = os.getenv("COSMOS_CONTAINER_NAME_USER_MEMORIES", "user-memories")
+COSMOS_REQUEST_TIMEOUT = int(os.getenv("COSMOS_REQUEST_TIMEOUT", 5))
 
 if not COSMOS_ENDPOINT:
     raise RuntimeError("Missing required environment variable COSMOS_ENDPOINT")
@@ -209,29 +257,51 @@ logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 logger.setLevel(LOG_LEVEL)
 
-# Azure Monitor
-configure_azure_monitor(
-    enable_live_metrics=True,
-    instrumentation_options={
-        "azure_sdk": {"enabled": True},
-        "django": {"enabled": False},
-        "fastapi": {"enabled": False},
-        "flask": {"enabled": False},
-        "psycopg2": {"enabled": False},
-        "requests": {"enabled": False},
-        "urllib": {"enabled": False},
-        "urllib3": {"enabled": False},
-    }
-)
+def configure_telemetry():
+    """
+    Configure Azure Monitor, OpenAI instrumentation and the app attributes span processor.
+    Called from main() so importing the module stays cheap; spans from the module-level
+    tracer are routed to the configured provider once this has run.
+    """
+    # Set environment variable to capture message content
+    os.environ.setdefault("OTEL_INSTRUMENTATION_GENAI_CAPTURE_MESSAGE_CONTENT", "true")
+    
+    # The distro already exports through a BatchSpanProcessor; give it a large queue and fewer, larger
+    # exports since memory extraction is background work that does not need low-latency telemetry
+    os.environ.setdefault("OTEL_BSP_MAX_QUEUE_SIZE", "8192")
+    os.environ.setdefault("OTEL_BSP_MAX_EXPORT_BATCH_SIZE", "1024")
+    os.environ.setdefault("OTEL_BSP_SCHEDULE_DELAY", "5000")
+    
+    # Skip loading instrumentations for libraries this worker does not use
+    os.environ.setdefault("OTEL_PYTHON_DISABLED_INSTRUMENTATIONS", "django,fastapi,flask,psycopg2,requests,urllib,urllib3")
+    
+    # Azure Monitor
+    configure_azure_monitor(
+        enable_live_metrics=True,
+        instrumentation_options={
+            "azure_sdk": {"enabled": True},
+            "django": {"enabled": False},
+            "fastapi": {"enabled": False},
+            "flask": {"enabled": False},
+            "psycopg2": {"enabled": False},
+            "requests": {"enabled": False},
+            "urllib": {"enabled": False},
+            "urllib3": {"enabled": False},
+        }
+    )
+    
+    # Enable OpenTelemetry instrumentation for OpenAI SDK
+    OpenAIInstrumentor().instrument()
+    
+    # Add our custom span processor to the global tracer provider
+    tracer_provider = trace.get_tracer_provider()
+    if hasattr(tracer_provider, 'add_span_processor'):
+        app_attributes_processor = AppAttributesSpanProcessor()
+        tracer_provider.add_span_processor(app_attributes_processor)
+        logger.info("Custom span processor for application attributes added successfully")
+    else:
+        logger.warning("Could not add custom span processor - tracer provider doesn't support it")
 
-# Add our custom span processor to the global tracer provider
-tracer_provider = trace.get_tracer_provider()
-if hasattr(tracer_provider, 'add_span_processor'):
-    app_attributes_processor = AppAttributesSpanProcessor()
-    tracer_provider.add_span_processor(app_attributes_processor)
-    logger.info("Custom span processor for application attributes added successfully")
-else:
-    logger.warning("Could not add custom span processor - tracer provider doesn't support it")
 
 tracer = trace.get_tracer(__name__)
 
@@ -242,13 +312,26 @@ shared_credential = DefaultAzureCredential(exclude_interactive_browser_credentia
 redis_client = None
 chat_client = None
 cosmos_client = None
+conversations_container = None
+user_memories_container = None
 
 # Global shutdown event for graceful shutdown
 shutdown_event = asyncio.Event()
 
+# Paces chat and embedding calls so rate limits slow LLM work down instead of failing messages
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+def normalize_embedding(vector: List[float]) -> List[float]:
+    """Scale an embedding to unit length so similarity reduces to a dot product."""
+    norm = math.sqrt(math.fsum(x * x for x in vector))
+    if norm == 0:
+        return vector
+    return [x / norm for x in vector]
+
+
 async def generate_vector_embedding(text: str) -> List[float]:
     """
-    Generate vector embedding for the given text using Azure OpenAI.
+    Generate a unit-length vector embedding for the given text using Azure OpenAI.
     
     Args:
         text: The text to generate embeddings for
@@ -260,11 +343,12 @@ async def generate_vector_embedding(text: str) -> List[float]:
         Exception: If embedding generation fails
     """
     try:
-        response = await chat_client.embeddings.create(
-            input=[text],
-            model=AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT_NAME
-        )
-        return response.data[0].embedding
+        async with llm_semaphore:
+            response = await chat_client.embeddings.create(
+                input=[text],
+                model=AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT_NAME
+            )
+        return normalize_embedding(response.data[0].embedding)
     except Exception as e:
         logger.error(f"Error generating vector embedding: {e}")
         return []
@@ -286,48 +370,26 @@ async def extract_conversation_summary(conversation_data: dict) -> dict:
             )
             return default_summary.model_dump()
         
-        # Build conversation text for analysis
-        conversation_text = ""
-        for msg in messages:
+        # Build conversation text for analysis from the most recent messages
+        conversation_lines = []
+        for msg in messages[-CONVERSATION_MAX_MESSAGES:]:
             role = msg.get("role", "unknown")
-            content = msg.get("content", "")
-            conversation_text += f"{role}: {content}\n"
+            content = (msg.get("content") or "")[:CONVERSATION_MAX_MESSAGE_CHARS]
+            conversation_lines.append(f"{role}: {content}\n")
+        conversation_text = "".join(conversation_lines)
         
-        # Prepare LLM prompt for structured output
-        system_prompt = """
-You are a conversation analyzer. Analyze the following conversation and extract key information.
-
-Focus on:
-- Creating a concise paragraph summary of the conversation
-- Identifying key topics/themes discussed (maximum 5)
-- Finding people mentioned by name (excluding the user and assistant)
-- Locating specific places or locations mentioned
-- Determining the overall user sentiment
-
-Focus on factual information and avoid speculation. 
-It is OK to return empty field if not applicable. 
-Return structured data following the specified schema.
-"""
-
         user_prompt = f"Analyze this conversation:\n\n{conversation_text}"
-        response = await chat_client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT_NAME,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.1,
-            max_tokens=1000,
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "ConversationAnalysis", 
-                    "schema": ConversationSummary.model_json_schema(),
-                    "description": "Structured analysis of a conversation including summary, themes, persons, places, and user sentiment",
-                    "strict": True
-                }
-            }
-        )
+        async with llm_semaphore:
+            response = await chat_client.chat.completions.create(
+                model=AZURE_OPENAI_DEPLOYMENT_NAME,
+                messages=[
+                    {"role": "system", "content": CONVERSATION_SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0.1,
+                max_tokens=1000,
+                response_format=CONVERSATION_SUMMARY_RESPONSE_FORMAT
+            )
         
         # Parse the structured response
         content = response.choices[0].message.content
@@ -367,21 +429,29 @@ async def extract_user_memory_updates(conversation_data: dict, existing_memory:
         if not messages:
             return {}
         
-        # Build conversation text for analysis
-        conversation_text = ""
+        # Build conversation text for analysis from the most recent messages; non-user
+        # messages are only context, so they are cut down to short snippets
+        conversation_lines = []
         user_messages = []
-        for msg in messages:
+        for msg in messages[-CONVERSATION_MAX_MESSAGES:]:
             role = msg.get("role", "unknown")
-            content = msg.get("content", "")
-            conversation_text += f"{role}: {content}\n"
+            content = msg.get("content") or ""
             if role == "user":
+                content = content[:CONVERSATION_MAX_MESSAGE_CHARS]
                 user_messages.append(content)
+            else:
+                content = content[:MEMORY_ASSISTANT_CONTEXT_CHARS]
+            conversation_lines.append(f"{role}: {content}\n")
+        conversation_text = "".join(conversation_lines)
         
         if not user_messages:
             return {}
         
         # Prepare LLM prompt for user memory extraction
-        existing_memory_json = json.dumps(existing_memory, indent=2)
+        # Compact JSON of the memory fields only; Cosmos system properties would just cost tokens
+        existing_memory_json = orjson.dumps(
+            {field: existing_memory.get(field, []) for field in USER_MEMORY_FIELDS}
+        ).decode()
         system_prompt = f"""
 You are a user memory extractor. Based on the conversation, identify any new information about the user that should be added to their memory profile.
 
@@ -407,24 +477,17 @@ IMPORTANT: You must provide values for ALL fields in the response. If there is n
 """
 
         user_prompt = f"Extract new user memory information from this conversation:\n\n{conversation_text}"
-        response = await chat_client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT_NAME,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.1,
-            max_tokens=1000,
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "UserMemoryUpdates",
-                    "schema": UserMemoryUpdates.model_json_schema(),
-                    "description": "Updates to user memory based on conversation analysis",
-                    "strict": True
-                }
-            }
-        )
+        async with llm_semaphore:
+            response = await chat_client.chat.completions.create(
+                model=AZURE_OPENAI_DEPLOYMENT_NAME,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0.1,
+                max_tokens=1000,
+                response_format=USER_MEMORY_UPDATES_RESPONSE_FORMAT
+            )
           # Parse the structured response
         content = response.choices[0].message.content
         try:
@@ -451,7 +514,7 @@ IMPORTANT: You must provide values for ALL fields in the response. If there is n
         return {}
 
 
-async def store_conversation_memory(session_id: str, user_id: str, analysis: dict):
+async def store_conversation_memory(session_id: str, user_id: str, analysis: dict, timestamp: str):
     """
     Store conversation memory to CosmosDB.
     """
@@ -472,80 +535,40 @@ User sentiment: {analysis['user_sentiment']}"""
             "userId": user_id,
             "sessionId": session_id,
             "summary": analysis["summary"],
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            # Pre-lowercased copy so the Memory API text search avoids LOWER() per document
+            "summary_lower": analysis["summary"].lower(),
+            "timestamp": timestamp,
             "themes": analysis["themes"],
             "persons": analysis["persons"],
             "places": analysis["places"],
             "user_sentiment": analysis["user_sentiment"],
             "vector_embedding": vector_embedding
         }
-          # Get conversations container
-        database = cosmos_client.get_database_client(COSMOS_DATABASE_NAME)
-        container = database.get_container_client(COSMOS_CONTAINER_NAME_CONVERSATIONS)
-        
         # Upsert the document
-        await container.upsert_item(conversation_doc)
+        await conversations_container.upsert_item(conversation_doc)
         logger.info(f"Stored conversation memory for session {session_id} in CosmosDB")
                 
     except Exception as e:
         logger.error(f"Error storing conversation memory to CosmosDB: {e}")
 
 
-async def update_user_memory(user_id: str, updates: dict):
+async def update_user_memory(user_id: str, updates: dict, existing_memory: dict, timestamp: str):
     """
     Update user memory directly in CosmosDB.
-    Memory fields are REPLACED with LLM output (not merged) since LLM already does consolidation.
-    Only system fields like userId, id, timestamp are preserved.
+    Memory fields returned by the LLM are REPLACED (not merged) since LLM already does consolidation;
+    fields it left out keep their values from the already loaded existing_memory, so the whole
+    document is upserted without another read.
     """
     if not updates:
         return
         
     try:
-        # Get user memories container
-        database = cosmos_client.get_database_client(COSMOS_DATABASE_NAME)
-        container = database.get_container_client(COSMOS_CONTAINER_NAME_USER_MEMORIES)
-        
-        # Try to get existing user memory document
-        try:
-            existing_doc = await container.read_item(item=user_id, partition_key=user_id)
-        except:
-            # Create new document if doesn't exist
-            existing_doc = {
-                "id": user_id,
-                "userId": user_id,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "output_preferences": [],
-                "personal_preferences": [],
-                "assistant_preferences": [],
-                "knowledge": [],
-                "interests": [],
-                "dislikes": [],
-                "family_and_friends": [],
-                "work_profile": [],
-                "goals": []
-            }
-        
-        # Memory field names that should be replaced (not merged) since LLM does consolidation
-        memory_fields = {
-            "output_preferences", "personal_preferences", "assistant_preferences",
-            "knowledge", "interests", "dislikes", "family_and_friends", 
-            "work_profile", "goals"
-        }
-        
-        # Update document with LLM output - REPLACE memory fields, preserve system fields
-        for key, value in updates.items():
-            if key in memory_fields:
-                # Replace memory fields entirely with LLM's consolidated output
-                existing_doc[key] = value
-            else:
-                # For non-memory fields, preserve existing logic (shouldn't happen with current schema)
-                existing_doc[key] = value
-        
-        # Update timestamp
-        existing_doc["timestamp"] = datetime.now(timezone.utc).isoformat()
+        user_doc = {field: updates.get(field, existing_memory.get(field, [])) for field in USER_MEMORY_FIELDS}
+        user_doc["id"] = user_id
+        user_doc["userId"] = user_id
+        user_doc["timestamp"] = timestamp
         
-        # Upsert the document
-        await container.upsert_item(existing_doc)
+        await user_memories_container.upsert_item(user_doc)
         logger.info(f"Updated user memory for user {user_id} in CosmosDB - replaced fields: {list(updates.keys())}")
                 
     except Exception as e:
@@ -555,43 +578,17 @@ async def update_user_memory(user_id: str, updates: dict):
 async def get_existing_user_memory(user_id: str) -> dict:
     """
     Get existing user memory from CosmosDB.
+    Only a missing document yields an empty profile; other errors are raised so the
+    message is retried instead of the stored profile being replaced from an empty one.
     """
-    try:        
-        # Get user memories container
-        database = cosmos_client.get_database_client(COSMOS_DATABASE_NAME)
-        container = database.get_container_client(COSMOS_CONTAINER_NAME_USER_MEMORIES)
-        
-        # Try to read user memory document
-        try:
-            existing_memory = await container.read_item(item=user_id, partition_key=user_id)
-            return existing_memory
-        except:
-            # Return empty memory structure if document doesn't exist
-            return {
-                "output_preferences": [],
-                "personal_preferences": [],
-                "assistant_preferences": [],
-                "knowledge": [],
-                "interests": [],
-                "dislikes": [],
-                "family_and_friends": [],
-                "work_profile": [],
-                "goals": []
-            }
-                
+    try:
+        return await user_memories_container.read_item(item=user_id, partition_key=user_id)
+    except exceptions.CosmosResourceNotFoundError:
+        # Return empty memory structure if document doesn't exist
+        return {field: [] for field in USER_MEMORY_FIELDS}
     except Exception as e:
         logger.error(f"Error getting existing user memory from CosmosDB: {e}")
-        return {
-            "output_preferences": [],
-            "personal_preferences": [],
-            "assistant_preferences": [],
-            "knowledge": [],
-            "interests": [],
-            "dislikes": [],
-            "family_and_friends": [],
-            "work_profile": [],
-            "goals": []
-        }
+        raise
 
 
 async def get_conversation_from_redis(session_id: str) -> dict:
@@ -599,17 +596,48 @@ async def get_conversation_from_redis(session_id: str) -> dict:
     Fetch conversation data from Redis.
     """
     try:
-        conversation_json = await redis_client.get(f"session:{session_id}")
-        if conversation_json:
-            return json.loads(conversation_json)
-        else:
+        # Read both the single-document and the list-based conversation layouts in one round trip
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.get(f"session:{session_id}")
+            pipe.hgetall(f"session:{session_id}:meta")
+            pipe.lrange(f"session:{session_id}:messages", 0, -1)
+            conversation_json, meta, stored_messages = await pipe.execute()
+        if not conversation_json and not meta:
             logger.warning(f"No conversation found in Redis for session {session_id}")
             return {}
+        conversation = orjson.loads(conversation_json) if conversation_json else {"title": None, "messages": []}
+        for field, value in meta.items():
+            conversation[field.decode()] = value.decode()
+        if stored_messages:
+            conversation.setdefault("messages", []).extend(orjson.loads(m) for m in stored_messages)
+        return conversation
     except Exception as e:
         logger.error(f"Error fetching conversation from Redis: {e}")
         return {}
 
 
+async def summarize_and_store_conversation(session_id: str, user_id: str, conversation_data: dict, timestamp: str):
+    """
+    Extract the conversation summary and store it as conversation memory.
+    """
+    analysis = await extract_conversation_summary(conversation_data)
+    await store_conversation_memory(session_id, user_id, analysis, timestamp)
+
+
+async def refresh_user_memory(user_id: str, conversation_data: dict, timestamp: str) -> dict:
+    """
+    Extract user memory updates against the stored profile and apply them.
+    
+    Returns:
+        dict: The applied memory updates (empty if nothing new was found)
+    """
+    existing_memory = await get_existing_user_memory(user_id)
+    memory_updates = await extract_user_memory_updates(conversation_data, existing_memory)
+    if memory_updates:
+        await update_user_memory(user_id, memory_updates, existing_memory, timestamp)
+    return memory_updates
+
+
 async def process_completed_message(message_body: dict):
     """
     Process a completed message and extract/store memories.
@@ -617,6 +645,8 @@ async def process_completed_message(message_body: dict):
     Args:
         message_body: Dictionary containing the completed message data
     """
+    dedup_key = None
+    processed = False
     try:
         session_id = message_body.get("sessionId")
         user_id = message_body.get("userId")
@@ -641,6 +671,16 @@ async def process_completed_message(message_body: dict):
                 logger.error(f"Missing sessionId or userId in message: {message_body}")
                 return
             
+            # Claim the chat message so duplicate deliveries do not repeat the extraction
+            if chat_message_id:
+                dedup_key = f"memory:processed:{chat_message_id}"
+                if not await redis_client.set(dedup_key, "1", nx=True, ex=PROCESSED_MESSAGE_CLAIM_TTL_SECONDS):
+                    dedup_key = None
+                    if span.is_recording():
+                        span.set_attribute("app.skipped", "duplicate_message")
+                    logger.info(f"Chat message {chat_message_id} already processed, skipping")
+                    return
+            
             logger.info(f"Processing memory extraction for session {session_id}, user {user_id}")
             
             # Fetch conversation data from Redis
@@ -652,25 +692,37 @@ async def process_completed_message(message_body: dict):
                 return
             
             # Add conversation metrics to span
+            messages = conversation_data.get("messages", [])
             if span.is_recording():
-                messages = conversation_data.get("messages", [])
                 span.set_attribute("app.message_count", len(messages))
             
-            # Extract conversation summary and metadata
-            analysis = await extract_conversation_summary(conversation_data)
+            # Without user messages there is nothing to summarize or remember
+            if not any(m.get("role") == "user" for m in messages):
+                if span.is_recording():
+                    span.set_attribute("app.skipped", "no_user_messages")
+                logger.info(f"No user messages in session {session_id}, skipping memory extraction")
+                return
+            
+            # One timestamp per message is shared by the conversation and user memory documents
+            timestamp = datetime.now(timezone.utc).isoformat()
             
-            # Store conversation memory
-            await store_conversation_memory(session_id, user_id, analysis)
+            # The conversation summary and the user memory update are independent, so run both
+            # pipelines concurrently instead of back to back. The task group cancels the other
+            # pipeline if one fails, so no LLM work continues after the message is given up
+            async with asyncio.TaskGroup() as pipelines:
+                pipelines.create_task(summarize_and_store_conversation(session_id, user_id, conversation_data, timestamp))
+                memory_task = pipelines.create_task(refresh_user_memory(user_id, conversation_data, timestamp))
+            memory_updates = memory_task.result()
+            processed = True
             
-            # Get existing user memory
-            existing_memory = await get_existing_user_memory(user_id)
+            # Keep the marker for the full window now that the memories are stored
+            if dedup_key:
+                try:
+                    await redis_client.expire(dedup_key, PROCESSED_MESSAGE_TTL_SECONDS)
+                except Exception as expire_error:
+                    logger.warning(f"Failed to extend processed marker {dedup_key}: {expire_error}")
             
-            # Extract user memory updates
-            memory_updates = await extract_user_memory_updates(conversation_data, existing_memory)
-              # Update user memory if there are changes
             if memory_updates:
-                await update_user_memory(user_id, memory_updates)
-                
                 # Add memory update metrics to span
                 if span.is_recording():
                     span.set_attribute("app.memory_updates_applied", True)
@@ -690,15 +742,25 @@ async def process_completed_message(message_body: dict):
                 error_span.set_attribute("app.operation", "process_completed_message")
         logger.error(f"Error processing completed message: {e}")
         raise
+    finally:
+        # Release the claim unless the memories were stored, including on cancellation,
+        # so the retried delivery is processed
+        if dedup_key and not processed:
+            try:
+                await redis_client.delete(dedup_key)
+            except Exception as delete_error:
+                logger.warning(f"Failed to release processed marker {dedup_key}: {delete_error}")
 
 
 async def _process_and_handle_message(sb_client: ServiceBusClient, msg: ServiceBusMessage, receiver, semaphore: asyncio.Semaphore, logger_instance: logging.Logger):
     """
-    Process a message, settle it, and release the concurrency semaphore.
+    Process a message under the concurrency semaphore, then settle it.
+    Settlement happens after the semaphore is released so the next message starts
+    processing while the completion round-trip is in flight.
     Simple approach: abandon any error so another worker can try.
     """
-    async with semaphore:
-        try:
+    try:
+        async with semaphore:
             # Check for shutdown before processing
             if shutdown_event.is_set():
                 logger_instance.info("Shutdown event set, abandoning message")
@@ -712,32 +774,32 @@ async def _process_and_handle_message(sb_client: ServiceBusClient, msg: ServiceB
                     handle_span.set_attribute("app.operation", "handle_service_bus_message")
                 
                 # Process the message - this will set context variables and create child spans
-                message_body = json.loads(str(msg))
+                message_body = orjson.loads(b"".join(msg.body))
                 logger_instance.info(f"Received message: {message_body}")
                 await process_completed_message(message_body)
-                
-                # Complete the message if processing was successful
-                await receiver.complete_message(msg)
-                logger_instance.debug(f"Message {msg.message_id} completed successfully")
-            
-        except Exception as e:
-            logger_instance.error(f"Error processing message {msg.message_id}: {e}")
+        
+        # Complete the message if processing was successful
+        await receiver.complete_message(msg)
+        logger_instance.debug(f"Message {msg.message_id} completed successfully")
+        
+    except Exception as e:
+        logger_instance.error(f"Error processing message {msg.message_id}: {e}")
+        
+        # Create an error span that will also get context attributes if they were set
+        with tracer.start_as_current_span("handle_service_bus_message_error") as error_span:
+            if error_span.is_recording():
+                error_span.set_attribute("app.message_id", msg.message_id)
+                error_span.set_attribute("app.operation", "handle_service_bus_message_error")
+                error_span.set_attribute("app.error", str(e))
             
-            # Create an error span that will also get context attributes if they were set
-            with tracer.start_as_current_span("handle_service_bus_message_error") as error_span:
-                if error_span.is_recording():
-                    error_span.set_attribute("app.message_id", msg.message_id)
-                    error_span.set_attribute("app.operation", "handle_service_bus_message_error")
-                    error_span.set_attribute("app.error", str(e))
-                
-                try:
-                    # Abandon all errors so another worker can try
-                    await receiver.abandon_message(msg)
-                    logger_instance.warning(f"Message {msg.message_id} abandoned for another worker to try")
-                        
-                except Exception as settle_error:
-                    logger_instance.error(f"Error settling message {msg.message_id}: {settle_error}")
-                    # If we can't settle the message, it will be retried automatically
+            try:
+                # Abandon all errors so another worker can try
+                await receiver.abandon_message(msg)
+                logger_instance.warning(f"Message {msg.message_id} abandoned for another worker to try")
+                    
+            except Exception as settle_error:
+                logger_instance.error(f"Error settling message {msg.message_id}: {settle_error}")
+                # If we can't settle the message, it will be retried automatically
 
 
 async def setup_signal_handlers():
@@ -778,7 +840,9 @@ async def main():
     """
     Main application entry point.
     """
-    global redis_client, chat_client, cosmos_client
+    global redis_client, chat_client, cosmos_client, conversations_container, user_memories_container
+    
+    configure_telemetry()
     
     logger.info("Starting Memory Worker service...")
     
@@ -799,6 +863,8 @@ async def main():
             credential_provider=redis_credential_provider,
             protocol=3,
             health_check_interval=30,
+            # Each in-flight message holds at most one connection, so the shared pool stays small and warm
+            max_connections=MAX_CONCURRENCY * 2,
         )
         
         # Test Redis connection
@@ -809,17 +875,38 @@ async def main():
             token = await shared_credential.get_token("https://cognitiveservices.azure.com/.default")
             return token.token
         
+        # HTTP/2 lets the concurrent summary, memory and embedding calls of all in-flight
+        # messages multiplex over shared TLS connections
+        chat_http_client = DefaultAsyncHttpxClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=MAX_CONCURRENCY * 4,
+                max_keepalive_connections=MAX_CONCURRENCY * 2,
+                keepalive_expiry=75,
+            ),
+        )
+        
         chat_client = AsyncAzureOpenAI(
             azure_endpoint=AZURE_OPENAI_ENDPOINT,
             azure_ad_token_provider=get_azure_token,
-            api_version=AZURE_OPENAI_API_VERSION        )
+            api_version=AZURE_OPENAI_API_VERSION,
+            http_client=chat_http_client,
+        )
         logger.info("OpenAI client initialized")
         
         # Initialize CosmosDB client
         cosmos_client = CosmosClient(
             url=COSMOS_ENDPOINT,
-            credential=shared_credential
+            credential=shared_credential,
+            # The Python SDK only speaks Gateway mode; bound each request instead
+            consistency_level="Session",
+            connection_timeout=COSMOS_REQUEST_TIMEOUT,
         )
+        
+        # Resolve container handles once; they are reused by every message
+        cosmos_database = cosmos_client.get_database_client(COSMOS_DATABASE_NAME)
+        conversations_container = cosmos_database.get_container_client(COSMOS_CONTAINER_NAME_CONVERSATIONS)
+        user_memories_container = cosmos_database.get_container_client(COSMOS_CONTAINER_NAME_USER_MEMORIES)
         logger.info("CosmosDB client initialized")
         
     except Exception as e:
@@ -829,6 +916,8 @@ async def main():
     # Initialize semaphore for concurrency control and task tracking
     semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
     active_tasks = set()
+    # Keeps locks alive for received messages while they are processed
+    lock_renewer = AutoLockRenewer(max_lock_renewal_duration=MAX_LOCK_RENEWAL_DURATION)
     
     try:
         while not shutdown_event.is_set():
@@ -843,30 +932,39 @@ async def main():
                     async with servicebus_client.get_subscription_receiver(
                         topic_name=SERVICEBUS_MESSAGE_COMPLETED_TOPIC,
                         subscription_name=SERVICEBUS_MESSAGE_COMPLETED_SUBSCRIPTION,
-                        max_wait_time=30,
-                        max_concurrent_calls=MAX_CONCURRENCY
+                        prefetch_count=SERVICEBUS_PREFETCH_COUNT,
+                        auto_lock_renewer=lock_renewer
                     ) as receiver:
                         
                         logger.info("Memory Worker is running and listening for messages...")
                         
-                        async for msg in receiver:
-                            # Check for shutdown
-                            if shutdown_event.is_set():
-                                logger.info("Shutdown event set, stopping message reception")
-                                await receiver.abandon_message(msg)
-                                break
+                        # max_wait_time bounds each receive so shutdown is checked regularly
+                        while not shutdown_event.is_set():
+                            # Only take messages there is a free slot for, so none wait on the semaphore
+                            free_slots = MAX_CONCURRENCY - len(active_tasks)
+                            if free_slots <= 0:
+                                await asyncio.wait(active_tasks, return_when=asyncio.FIRST_COMPLETED)
+                                active_tasks = {t for t in active_tasks if not t.done()}
+                                continue
                             
-                            # Create a task to process the message
-                            task = asyncio.create_task(
-                                _process_and_handle_message(servicebus_client, msg, receiver, semaphore, logger)
-                            )
-                            active_tasks.add(task)
+                            received_messages = await receiver.receive_messages(max_message_count=free_slots, max_wait_time=5)
+                            
+                            for msg in received_messages:
+                                # Create a task to process the message; it abandons the message itself on shutdown
+                                task = asyncio.create_task(
+                                    _process_and_handle_message(servicebus_client, msg, receiver, semaphore, logger)
+                                )
+                                active_tasks.add(task)
                             
                             # Remove completed tasks from the set
                             active_tasks = {t for t in active_tasks if not t.done()}
                             
                             logger.debug(f"Active tasks count: {len(active_tasks)}")
                         
+                        # Settle in-flight messages while the receiver link is still open
+                        await wait_for_tasks_completion(active_tasks, timeout=60)
+                        active_tasks = {t for t in active_tasks if not t.done()}
+                        
             except Exception as e:
                 if shutdown_event.is_set():
                     logger.info("Shutdown initiated, stopping message processing")
@@ -880,6 +978,11 @@ async def main():
         
         # Wait for active tasks to complete during shutdown
         await wait_for_tasks_completion(active_tasks, timeout=60)
+        
+        try:
+            await lock_renewer.close()
+        except Exception as e:
+            logger.warning(f"Error closing lock renewer: {e}")
           # Cleanup resources
         try:
             if redis_client:
@@ -69,6 +69,18 @@ resource "azapi_resource" "memory_api" {
                 name  = "AZURE_OPENAI_API_VERSION"
                 value = "2025-04-01-preview"
               },
+              {
+                name  = "REDIS_HOST"
+                value = azapi_resource.redis.output.properties.hostName
+              },
+              {
+                name  = "REDIS_PORT"
+                value = "10000"
+              },
+              {
+                name  = "REDIS_SSL"
+                value = "true"
+              },
               {
                 name  = "LOG_LEVEL"
                 value = "INFO"
@@ -90,4 +90,20 @@ resource "azapi_resource" "redis_access_sse_service" {
   }
 
   depends_on = [azapi_resource.redis_access_front_service]
-}
\ No newline at end of file
+}
+
+resource "azapi_resource" "redis_access_memory_api" {
+  type      = "Microsoft.Cache/redisEnterprise/databases/accessPolicyAssignments@2024-09-01-preview"
+  name      = "memoryapi"
+  parent_id = azapi_resource.redis_db.id
+  body = {
+    properties = {
+      accessPolicyName = "default"
+      user = {
+        objectId = azurerm_user_assigned_identity.memory_api.principal_id
+      }
+    }
+  }
+
+  depends_on = [azapi_resource.redis_access_sse_service]
+}